@@ -0,0 +1,125 @@
+# benchmarks/imports.py
+"""
+Import-time budget for the dashboard's modules and pages.
+
+    python -m benchmarks.imports                       # report every target
+    python -m benchmarks.imports --check               # exit 1 on a breach
+    python -m benchmarks.imports pages/1_Country_Profiles.py --top 20
+
+Each target is imported in a fresh interpreter with -X importtime, so
+the numbers are a cold start with a warm OS file cache, net of what
+the interpreter imports at startup anyway. A page target runs only
+the page's top-level import statements. A target breaches its budget
+when it takes longer than its seconds or when it imports a module it
+must leave to the code path that needs it (documents, Parquet spills,
+figures served from the figure cache).
+
+Run from the repository root. Like the benchmark baselines, the
+seconds are machine-specific; the forbidden imports are not.
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOCS = ("docx", "reportlab")
+
+# target: (seconds, modules it must not import)
+# (streamlit itself imports the plotly base package, so only plotly.express
+# is worth keeping off a path; pandas imports pyarrow when it is installed)
+BUDGETS = {
+    "utils.metrics": (0.05, ("pandas", "streamlit", "http.server")),
+    "utils.schema": (1.0, ("streamlit",)),
+    "utils.uploads": (1.2, ("streamlit", "pyarrow.parquet")),
+    "utils.ingest": (1.0, ("streamlit",)),
+    "utils.montecarlo": (1.0, ("streamlit", "plotly")),
+    "utils.reports": (0.1, DOCS + ("pandas",)),
+    "utils.load_data": (2.0, DOCS + ("plotly.express", "pyarrow.parquet")),
+    "utils.partitions": (1.0, ("streamlit",)),
+    "utils.cube": (1.0, ("streamlit", "plotly")),
+    "utils.exports": (1.0, ("streamlit", "openpyxl", "pyarrow.parquet")),
+    "utils.derived": (2.0, DOCS + ("streamlit", "plotly")),
+    "utils.batch": (2.0, DOCS + ("streamlit", "plotly")),
+    "dashboard_login.py": (1.5, DOCS + ("pandas", "plotly.express")),
+    "pages/1_Country_Profiles.py": (2.5, DOCS + ("plotly.express",)),
+    "pages/2_Cross_Country_Comparison.py": (2.5, DOCS + ("plotly.express",)),
+    "pages/3_Quality_Assurance.py": (2.5, DOCS + ("plotly.express",)),
+    "pages/4_PFM_and_Co_financing.py": (2.5, DOCS + ("plotly.express",)),
+    "pages/5_Regional_Overview.py": (3.0, DOCS + ("plotly.express",)),
+    "pages/6_Search.py": (2.5, DOCS + ("plotly.express",)),
+}
+
+# -----------------------
+# MEASUREMENT
+# -----------------------
+def _source(target) -> str:
+    """
+    Code importing target: the module itself, or a script's top-level
+    import statements (running the script would need a Streamlit session).
+    """
+    if not target.endswith(".py"):
+        return f"import {target}"
+    with open(os.path.join(ROOT, target), encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return "\n".join(ast.unparse(n) for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom)))
+
+def import_times(target=None) -> list:
+    """
+    (module, self seconds, cumulative seconds, depth) for every module
+    target imports, in import order. Without a target, the modules the
+    interpreter imports at startup.
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT, STREAMLIT_LOGGER_LEVEL="error")
+    code = _source(target) if target else "pass"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(own) / 1e6, int(cumulative) / 1e6, depth))
+    return rows
+
+def _imports(rows, module) -> bool:
+    return any(name == module or name.startswith(module + ".") for name, *_ in rows)
+
+# -----------------------
+# RUNNER
+# -----------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("targets", nargs="*", help="modules or page scripts (default: every budgeted target)")
+    parser.add_argument("--top", type=int, default=0, help="also list the N slowest top-level imports of each target")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any target breaches its budget")
+    args = parser.parse_args(argv)
+
+    startup = {name for name, *_ in import_times()}
+    breaches = []
+    print(f"{'target':<40}{'seconds':>10}{'budget':>10}  notes")
+    for target in args.targets or BUDGETS:
+        rows = [r for r in import_times(target) if r[0] not in startup]
+        total = sum(own for _, own, _, _ in rows)
+        budget, forbidden = BUDGETS.get(target, (None, ()))
+        notes = [f"imports {m}" for m in forbidden if _imports(rows, m)]
+        if budget is not None and total > budget:
+            notes.insert(0, "over budget")
+        if notes:
+            breaches.append(target)
+        print(f"{target:<40}{total:>10.3f}{budget if budget else float('nan'):>10.2f}  {', '.join(notes)}")
+        for name, _, cumulative, _ in sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])[:args.top]:
+            print(f"    {name:<36}{cumulative:>10.3f}")
+
+    if args.check and breaches:
+        print(f"Import budget breached: {', '.join(breaches)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
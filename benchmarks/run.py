@@ -0,0 +1,262 @@
+# benchmarks/run.py
+"""
+Benchmarks for the dashboard's hot paths on synthetic data.
+
+    python -m benchmarks.run --scale small            # compare with baselines.json
+    python -m benchmarks.run --scale medium --save    # record new baselines
+    python -m benchmarks.run --scale small --check    # exit 1 on a regression
+
+Run from the repository root. Each benchmark reports the best of
+--repeat runs. Baselines are machine-specific: record them on the
+machine you compare on.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import pandas as pd
+
+from benchmarks.synthetic import SCALES, generate
+
+# -----------------------
+# BENCHMARKS
+# -----------------------
+def _touch(data):
+    return sum(len(data[k]) for k in data)
+
+def bench_load_all_cold(ctx):
+    from utils.load_data import load_all, _shared_frame
+    shutil.rmtree("data/.snapshots", ignore_errors=True)
+    _shared_frame.clear()
+    return lambda: _touch(load_all())
+
+def bench_load_all_snapshot(ctx):
+    from utils.load_data import load_all, _shared_frame
+    _touch(load_all())
+    def run():
+        _shared_frame.clear()
+        return _touch(load_all())
+    return run
+
+def bench_load_all_cached(ctx):
+    from utils.load_data import load_all
+    _touch(load_all())
+    return lambda: _touch(load_all())
+
+def bench_kpi_pipeline(ctx):
+    from utils.ingest import load_dimensions, compute_kpis
+    from utils.derived import risk_score
+    dims = load_dimensions()
+    def run():
+        kpis, _ = compute_kpis(dims)
+        return risk_score(kpis)
+    return run
+
+def bench_kpis_from_store(ctx):
+    # A server process whose memo is cold, reading what a batch run stored
+    from utils.dag import OutputStore
+    from utils.derived import derived
+    derived.store = OutputStore(tempfile.mkdtemp(prefix="derived_", dir="."))  # removed with the data tree
+    derived.get("kpis")
+    def run():
+        derived._memo.clear()
+        return derived.get("kpis")
+    return run
+
+def bench_partition_build(ctx):
+    from utils.ingest import REGIONAL_FILES, PO_DATES
+    from utils.partitions import build_partitions
+    return lambda: build_partitions(REGIONAL_FILES["procurements"], PO_DATES, "po_date")
+
+def bench_country_year(ctx):
+    from utils.ingest import load_dimensions, country_transactions
+    dims = load_dimensions()
+    country_transactions(1, dims, years=[2024])
+    return lambda: country_transactions(1, dims, years=[2024])
+
+def bench_qa_scoring(ctx):
+    from utils.load_data import load_csv, DATA_FILES
+    from utils.scoring import score, QA_READINESS
+    qa = load_csv(DATA_FILES["qa"])
+    rows = pd.concat([qa] * (ctx["facilities"] * ctx["years"]), ignore_index=True)
+    return lambda: score(rows, QA_READINESS)
+
+def bench_style_table(ctx):
+    from utils import formatting
+    from utils.load_data import load_csv, DATA_FILES
+    proc = load_csv(DATA_FILES["procurement"])
+    table = pd.concat([proc] * ctx["facilities"], ignore_index=True)
+    def run():
+        formatting._cache.clear()
+        return formatting.style_table(table)
+    return run
+
+def bench_monte_carlo(ctx):
+    from utils import montecarlo
+    from utils.ingest import compute_distributions
+    params = montecarlo.distribution_params(compute_distributions())
+    return lambda: montecarlo.simulate(params, 1_000_000)
+
+def bench_search_index(ctx):
+    from utils.load_data import load_csv, DATA_FILES
+    from utils.search import SEARCH_DATASETS, build_index
+    frames = {k: load_csv(DATA_FILES[k]) for k in SEARCH_DATASETS}
+    return lambda: build_index(frames)
+
+def bench_search_query(ctx):
+    from utils.load_data import load_csv, DATA_FILES
+    from utils.search import SEARCH_DATASETS, build_index
+    index = build_index({k: load_csv(DATA_FILES[k]) for k in SEARCH_DATASETS})
+    queries = ["ARMP", "marches publics", "procurement del", "quality assurance stock"]
+    return lambda: [index.search(q) for q in queries]
+
+def _cube(ctx):
+    from utils.load_data import load_csv, DATA_FILES
+    from utils.ingest import REGIONAL_FILES
+    from utils.cube import CUBE_DATASETS
+    frames = {k: pd.concat([load_csv(DATA_FILES[k])] * ctx["facilities"], ignore_index=True) for k in CUBE_DATASETS}
+    return frames, pd.read_csv(REGIONAL_FILES["countries"])
+
+def bench_cube_build(ctx):
+    from utils.cube import build_cube
+    frames, countries = _cube(ctx)
+    return lambda: build_cube(frames, countries)
+
+def bench_cube_query(ctx):
+    from utils.cube import build_cube
+    cube = build_cube(*_cube(ctx))
+    return lambda: [cube.crosstab(d, c, "income_level") for d, c in cube.indicators()]
+
+def _export(fmt):
+    def setup(ctx):
+        from utils import exports
+        from utils.ingest import REGIONAL_FILES
+        exports.EXPORT_DIR = tempfile.mkdtemp(prefix="exports_", dir=".")  # removed with the data tree
+        sheets = [exports.sheet("procurements", REGIONAL_FILES["procurements"])]
+        exports.snapshot_table(REGIONAL_FILES["procurements"])  # snapshot built outside the timing
+        return lambda: exports.export_file(sheets, fmt)
+    return setup
+
+def _pack():
+    from utils.country_store import CountryStore, COUNTRY_DATASETS
+    from utils.load_data import load_csv, DATA_FILES
+    from utils.reports import country_pack
+    store = CountryStore({k: load_csv(DATA_FILES[k]) for k in COUNTRY_DATASETS})
+    return country_pack(store, store.countries[0])
+
+def bench_make_docx(ctx):
+    from utils import doc_generator
+    pack = _pack()
+    def run():
+        doc_generator.render_cache._items.clear()
+        return doc_generator.make_docx(**pack)
+    return run
+
+def bench_make_pdf(ctx):
+    from utils import doc_generator
+    pack = _pack()
+    def run():
+        doc_generator.render_cache._items.clear()
+        return doc_generator.make_pdf(**pack)
+    return run
+
+BENCHMARKS = {
+    "load_all_cold": bench_load_all_cold,
+    "load_all_snapshot": bench_load_all_snapshot,
+    "load_all_cached": bench_load_all_cached,
+    "kpi_pipeline": bench_kpi_pipeline,
+    "kpis_from_store": bench_kpis_from_store,
+    "partition_build": bench_partition_build,
+    "country_year": bench_country_year,
+    "qa_scoring": bench_qa_scoring,
+    "style_table": bench_style_table,
+    "monte_carlo": bench_monte_carlo,
+    "search_index": bench_search_index,
+    "search_query": bench_search_query,
+    "cube_build": bench_cube_build,
+    "cube_query": bench_cube_query,
+    "export_csv": _export("csv"),
+    "export_parquet": _export("parquet"),
+    "make_docx": bench_make_docx,
+    "make_pdf": bench_make_pdf,
+}
+
+# -----------------------
+# RUNNER
+# -----------------------
+def time_best(setup, ctx, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        # Setup runs each time so cold benchmarks start cold
+        run = setup(ctx)
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run_suite(scale, repeat=3, only=None, root=None):
+    ctx = dict(SCALES[scale])
+    keep = root is not None
+    root = root or tempfile.mkdtemp(prefix=f"htm_bench_{scale}_")
+    cwd = os.getcwd()
+    try:
+        if not os.path.exists(os.path.join(root, "data", "regional", "procurements.csv")):
+            generate(root, **ctx)
+        os.chdir(root)
+        return {name: time_best(setup, ctx, repeat) for name, setup in BENCHMARKS.items()
+                if not only or name in only}
+    finally:
+        os.chdir(cwd)
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS)
+    parser.add_argument("--root", help="reuse (or create) the synthetic data tree here")
+    parser.add_argument("--save", action="store_true", help="record the results as the baselines for this scale")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any benchmark exceeds its baseline by --tolerance")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-delta", type=float, default=0.01,
+                        help="ignore slowdowns smaller than this many seconds (timer noise)")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.scale, args.repeat, args.only, args.root)
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+    base = baselines.get(args.scale, {})
+
+    regressions = []
+    print(f"{'benchmark':<20}{'seconds':>10}{'baseline':>10}{'ratio':>8}")
+    for name, secs in results.items():
+        ref = base.get(name)
+        ratio = secs / ref if ref else None
+        if ratio and ratio > args.tolerance and secs - ref > args.min_delta:
+            regressions.append(name)
+        print(f"{name:<20}{secs:>10.4f}{ref if ref else float('nan'):>10.4f}{ratio if ratio else float('nan'):>8.2f}")
+
+    if args.save:
+        baselines[args.scale] = {**base, **{k: round(v, 6) for k, v in results.items()}}
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+    if args.check and regressions:
+        print(f"Regressions beyond {args.tolerance}x: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# benchmarks/synthetic.py
+"""
+Schema-faithful synthetic versions of every dataset, at configurable
+scale. generate(root, ...) writes root/data/*.csv (the DATA_FILES
+datasets) and root/data/regional/*.csv (the PO-level tables), so a
+process that chdirs into root loads them exactly like the real data.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.fx import RateTable
+from utils.schema import SCHEMAS
+
+SCALES = {
+    # countries x facilities x years x POs per facility-year
+    "small": dict(countries=6, facilities=5, years=2, pos=20),
+    "medium": dict(countries=50, facilities=20, years=5, pos=50),
+    "large": dict(countries=200, facilities=50, years=10, pos=100),
+}
+
+WORDS = ("procurement ministry health budget supplier tender delivery payment audit oversight "
+         "ARMP SoBAPS PCG CAME DNCMP Marchés Publics Pharmacie Centrale donor warehouse stockout "
+         "quality assurance prequalification financing disbursement allocation coordination").split()
+
+SUB_TOPICS = ["Policy and Regulatory Framework", "Procurement Cycle Mapping and Institutional Roles",
+              "Analysis of Bottlenecks and Root Causes", "Quality Assurance Mechanisms",
+              "Successful Practices and Innovations", "Recommendations"]
+
+CTEXT_COLUMNS = ["policy_framework", "procurement_cycle", "bottlenecks", "quality_assurance", "innovations"]
+CPFM_COLUMNS = ["Legal & Regulatory Framework", "Lead Procurement Institutions", "Donor Coordination",
+                "Estimation of Needs", "Costing Process", "Supplier Selection", "Contract Negotiation",
+                "Purchase Order Management", "Reception & Distribution", "Payment Processing",
+                "Quality Assurance Mechanisms", "Key Bottlenecks", "Successful Practices"]
+BUDGETING_COLUMNS = ["Existence of HTM Procurement Plan", "Estimation & Budgeting Process",
+                     "Integration into National Budget", "Key Stakeholders in HTM Planning",
+                     "Procurement Cycle Activities & Timelines", "Monitoring Tools & Mechanisms",
+                     "Legal Framework for Cofinancing", "Disbursement Procedures", "Accounting & Reporting Systems",
+                     "Audit & Evaluation Mechanisms", "Impact on HTM Procurement", "Recommendations"]
+
+FX_ANCHORS = {"EUR": 0.9, "GNF": 8600.0, "MRU": 39.7}  # units per USD
+FX_PEGS = {"XOF": ("EUR", 655.957)}  # CFA franc: fixed units per EUR
+PO_CURRENCIES = ["XOF", "GNF", "MRU"]
+
+def _walk(rng, n, sd=0.003, pull=0.005):
+    # Log-rate random walk pulled back toward 0, so it stays within a
+    # few percent of its anchor over any span
+    level, out = 0.0, np.empty(n)
+    for i, step in enumerate(rng.normal(0, sd, n)):
+        level += step - pull * level
+        out[i] = level
+    return np.exp(out)
+
+def fx_rates(rng, start, end) -> pd.DataFrame:
+    """
+    Synthetic weekday local-per-USD rates: a small random walk around
+    each FX_ANCHORS rate, and each FX_PEGS currency at its fixed rate to
+    the walked currency it is pegged to.
+    """
+    dates = pd.bdate_range(start, end)
+    walks = {c: (anchor * _walk(rng, len(dates))).round(4) for c, anchor in FX_ANCHORS.items()}
+    walks.update({c: (walks[base] * per_base).round(4) for c, (base, per_base) in FX_PEGS.items()})
+    return pd.concat([pd.DataFrame({"date": dates.strftime("%Y-%m-%d"), "currency": c, "local_per_usd": rates})
+                      for c, rates in walks.items()], ignore_index=True)
+
+def _text(rng, n, words=60):
+    vocab = np.array(WORDS)
+    out = []
+    for _ in range(n):
+        sentences = [" ".join(rng.choice(vocab, 12)).capitalize() + "." for _ in range(max(words // 12, 1))]
+        out.append(" ".join(sentences))
+    return out
+
+def _indicator_frame(rng, name, names):
+    cols = {"Country": names}
+    for col, kind in SCHEMAS[name].items():
+        if isinstance(kind, list):
+            cols[col] = rng.choice(kind, len(names))
+        else:
+            cols[col] = rng.integers(30, 100, len(names))
+    return pd.DataFrame(cols)
+
+def generate(root, countries=6, facilities=5, years=2, pos=20, seed=0):
+    """
+    Write a synthetic dataset tree under root. The PO table has
+    countries * facilities * years * pos rows and is written in
+    chunks. Returns the paths written.
+    """
+    rng = np.random.default_rng(seed)
+    data_dir = os.path.join(root, "data")
+    regional_dir = os.path.join(data_dir, "regional")
+    os.makedirs(regional_dir, exist_ok=True)
+    names = [f"Country {i:03d}" for i in range(1, countries + 1)]
+    written = []
+
+    def write(df, path):
+        df.to_csv(path, index=False)
+        written.append(path)
+
+    # Country-level indicator and narrative datasets
+    for name in ("procurement", "pfm", "qa", "cofinancing"):
+        write(_indicator_frame(rng, name, names), os.path.join(data_dir, f"{name}.csv"))
+    write(pd.DataFrame({"Country": names, **{c: _text(rng, countries) for c in CTEXT_COLUMNS}}),
+          os.path.join(data_dir, "ctexts.csv"))
+    write(pd.DataFrame({"Country": names, **{c: _text(rng, countries, 12) for c in CPFM_COLUMNS}}),
+          os.path.join(data_dir, "cpfm.csv"))
+    write(pd.DataFrame({"Country": names, **{c: _text(rng, countries, 12) for c in BUDGETING_COLUMNS}}),
+          os.path.join(data_dir, "budgeting.csv"))
+    summary = ["Observations:\n" + "\n".join(f"- {t}" for t in _text(rng, 5, 24)) for _ in SUB_TOPICS]
+    write(pd.DataFrame({"Sub-Topic": SUB_TOPICS, "Regional Summary": summary}), os.path.join(data_dir, "wca_summary.csv"))
+
+    # Regional PO-level tables
+    ids = np.arange(1, countries + 1)
+    write(pd.DataFrame({
+        "country_id": ids, "name": names, "iso3": [f"C{i:02X}"[-3:] for i in ids],
+        "lat": rng.uniform(4, 24, countries).round(2), "lon": rng.uniform(-17, 16, countries).round(2),
+        "region": "WCA", "income_level": rng.choice(["Low", "Lower-middle"], countries),
+    }), os.path.join(regional_dir, "countries.csv"))
+    write(pd.DataFrame({
+        "product_id": [1, 2, 3], "disease": ["HIV", "TB", "Malaria"],
+        "product_name": ["TLD (Tenofovir/Lamivudine/Dolutegravir)",
+                         "RHZE (Rifampicin/Isoniazid/Pyrazinamide/Ethambutol)", "Artemether-Lumefantrine 20/120mg"],
+    }), os.path.join(regional_dir, "products.csv"))
+    write(pd.DataFrame({"product_id": [1, 2, 3], "wambo_price_usd": [0.34, 0.28, 0.15],
+                        "gdf_price_usd": [0.33, 0.29, 0.14]}), os.path.join(regional_dir, "benchmarks.csv"))
+    first_year = 2024 - years + 1
+    rates = fx_rates(rng, f"{first_year}-01-01", "2025-12-31")
+    write(rates, os.path.join(regional_dir, "fx_rates.csv"))
+    table = RateTable(rates.assign(date=pd.to_datetime(rates["date"])))
+    cy = pd.MultiIndex.from_product([ids, range(first_year, 2025)], names=["country_id", "year"]).to_frame(index=False)
+    allocated = rng.integers(2_000_000, 20_000_000, len(cy))
+    write(cy.assign(allocated_htm_usd=allocated,
+                    disbursed_htm_usd=(allocated * rng.uniform(0.5, 1.0, len(cy))).astype(int),
+                    funding_source=rng.choice(["Gov", "Mixed"], len(cy))),
+          os.path.join(regional_dir, "budgets.csv"))
+
+    po_path = os.path.join(regional_dir, "procurements.csv")
+    per_year = countries * facilities * pos
+    for i, year in enumerate(range(first_year, 2025)):
+        n = per_year
+        po = pd.Timestamp(f"{year}-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+        delivery = po + pd.to_timedelta(rng.gamma(9, 11, n).astype(int), unit="D")
+        payment = delivery + pd.to_timedelta(rng.gamma(4, 15, n).astype(int), unit="D")
+        ordered = rng.integers(10, 700, n) * 1000
+        product = rng.integers(1, 4, n)
+        currency = rng.choice(PO_CURRENCIES, n)
+        usd_price = np.array([0.34, 0.28, 0.15])[product - 1] * rng.uniform(0.9, 1.3, n)
+        chunk = pd.DataFrame({
+            "procurement_id": np.arange(i * per_year + 1, (i + 1) * per_year + 1),
+            "country_id": np.repeat(ids, facilities * pos),
+            "product_id": product,
+            "po_date": po.strftime("%Y-%m-%d"),
+            "delivery_date": delivery.strftime("%Y-%m-%d"),
+            "payment_date": payment.strftime("%Y-%m-%d"),
+            "quantity_ordered": ordered,
+            "quantity_delivered": (ordered * rng.uniform(0.9, 1.0, n)).astype(int),
+            "unit_price_local": (usd_price * table.rate(currency, po)).round(2),
+            "currency": currency,
+            "funding_source": rng.choice(["Gov", "Mixed"], n),
+        })
+        chunk.to_csv(po_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+    written.append(po_path)
+    return written
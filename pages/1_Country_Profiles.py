@@ -1,71 +1,122 @@
+import io
 import streamlit as st
 import pandas as pd
-import random
-import numpy as np
-import plotly.express as px
-from utils.load_data import load_all, read_uploaded
-from utils.doc_generator import make_docx, make_pdf
-from utils.formatting import justify, style_table
+from utils.load_data import load_datasets, read_uploaded
+from utils.reports import country_pack, export_zip, export_compendium
+from utils.formatting import justify, paginated_table, table_stylesheet
 from utils.auth import require_login
+from utils.profiling import start_page, finish_page
+from utils.derived import derived
+from utils.batch import prebuilt_reports, PACKS_ZIP, COMPENDIUM
 
 # BLOCK access if not logged in
 require_login()
+run = start_page("Country Profiles")
 
-# -----------------------------------
-# PAGE TITLE
-# -----------------------------------
-st.title("Country Profiles")
+try:
+    # -----------------------------------
+    # PAGE TITLE
+    # -----------------------------------
+    st.title("Country Profiles")
 
-# Load data
-data = load_all()
-countries = data['procurement']['Country'].tolist()
+    # Load data (profiles come from the country-indexed store, see utils/country_store.py)
+    data = load_datasets()  # wca_summary loads lazily on export
+    store = derived.get('country_store')
+    countries = store.countries
 
-# -----------------------------------
-# COUNTRY SELECTION
-# -----------------------------------
-selected = st.selectbox("Select country to view profile", countries)
+    # -----------------------------------
+    # COUNTRY SELECTION
+    # -----------------------------------
+    selected = st.selectbox("Select country to view profile", countries)
+    if store.issues:
+        with st.expander("Data consistency warnings"):
+            for issue in store.issues:
+                st.markdown(f"- {issue}")
 
-# Extract selected country rows
-proc_row = data['procurement'][data['procurement']['Country'] == selected].iloc[0]
-pfm_row = data['pfm'][data['pfm']['Country'] == selected].iloc[0]
-qa_row = data['qa'][data['qa']['Country'] == selected].iloc[0]
-text_row = data['ctexts'][data['ctexts']['Country'] == selected].iloc[0]
+    # Extract selected country rows
+    profile = store.profile(selected)
+    proc_row = store.row(selected, 'procurement')
+    pfm_row = store.row(selected, 'pfm')
+    qa_row = store.row(selected, 'qa')
+    text_row = profile.get('ctexts', pd.Series(dtype=object))
 
-# -----------------------------------
-# TABLE FORMAT FUNCTION
-# -----------------------------------
-def format_table(row):
-    row = row.drop(labels=["Country"])
-    df = pd.DataFrame({
-        "Indicator": row.index,
-        "Value": row.values
-    })
-    return df
+    # -----------------------------------
+    # TABLE FORMAT FUNCTION
+    # -----------------------------------
+    def format_table(row):
+        df = pd.DataFrame({
+            "Indicator": row.index,
+            "Value": row.values
+        })
+        return df
 
-# Create tables
-proc_table = format_table(proc_row)
-pfm_table = format_table(pfm_row)
-qa_table = format_table(qa_row)
+    # Create tables
+    proc_table = format_table(proc_row)
+    pfm_table = format_table(pfm_row)
+    qa_table = format_table(qa_row)
 
-# -----------------------------------
-# DISPLAY SECTIONS
-# -----------------------------------
-st.subheader("Policy & Regulatory Framework")
-st.markdown(style_table(proc_table), unsafe_allow_html=True)
-st.markdown(justify(text_row["policy_framework"]), unsafe_allow_html=True)
+    # -----------------------------------
+    # DISPLAY SECTIONS
+    # -----------------------------------
+    # Long indicator tables are rendered a page at a time
+    st.markdown(table_stylesheet(), unsafe_allow_html=True)
 
-st.subheader("Procurement Cycle Mapping")
-st.markdown(style_table(pfm_table), unsafe_allow_html=True)
-st.markdown(justify(text_row["procurement_cycle"]), unsafe_allow_html=True)
+    st.subheader("Policy & Regulatory Framework")
+    paginated_table(proc_table, key=f"policy_page_{selected}")
+    st.markdown(justify(text_row.get("policy_framework", "")), unsafe_allow_html=True)
 
-st.subheader("Bottlenecks and Root Causes")
-st.markdown(style_table(qa_table), unsafe_allow_html=True)
-st.markdown(justify(text_row["bottlenecks"]), unsafe_allow_html=True)
+    st.subheader("Procurement Cycle Mapping")
+    paginated_table(pfm_table, key=f"cycle_page_{selected}")
+    st.markdown(justify(text_row.get("procurement_cycle", "")), unsafe_allow_html=True)
 
-st.subheader("Quality Assurance Mechanisms")
-st.markdown(style_table(qa_table), unsafe_allow_html=True)
-st.markdown(justify(text_row["quality_assurance"]), unsafe_allow_html=True)
+    st.subheader("Bottlenecks and Root Causes")
+    paginated_table(qa_table, key=f"bottlenecks_page_{selected}")
+    st.markdown(justify(text_row.get("bottlenecks", "")), unsafe_allow_html=True)
 
-st.subheader("Successful Practices & Innovations")
-st.markdown(style_table(qa_table), unsafe_allow_html=True)
-st.markdown(justify(text_row["innovations"]), unsafe_allow_html=True)
+    st.subheader("Quality Assurance Mechanisms")
+    paginated_table(qa_table, key=f"qa_page_{selected}")
+    st.markdown(justify(text_row.get("quality_assurance", "")), unsafe_allow_html=True)
+
+    st.subheader("Successful Practices & Innovations")
+    paginated_table(qa_table, key=f"innovations_page_{selected}")
+    st.markdown(justify(text_row.get("innovations", "")), unsafe_allow_html=True)
+
+    # -----------------------------------
+    # BATCH EXPORT
+    # -----------------------------------
+    st.subheader("Export Country Two-Pagers")
+    # Files rendered for the current data by the nightly batch run (python -m utils.batch)
+    prebuilt = prebuilt_reports()
+    if prebuilt:
+        def read_file(path):
+            with open(path, "rb") as f:
+                return f.read()
+        st.caption("Pre-rendered for all countries:")
+        c1, c2 = st.columns(2)
+        if PACKS_ZIP in prebuilt:
+            c1.download_button("Download all two-pagers (ZIP)", data=lambda: read_file(prebuilt[PACKS_ZIP]),
+                               file_name=PACKS_ZIP, mime="application/zip")
+        if COMPENDIUM in prebuilt:
+            c2.download_button("Download compendium (PDF)", data=lambda: read_file(prebuilt[COMPENDIUM]),
+                               file_name=COMPENDIUM, mime="application/pdf", key="prebuilt_compendium")
+    export_countries = st.multiselect("Countries", countries, default=countries)
+    export_formats = st.multiselect("Formats", ["docx", "pdf"], default=["docx", "pdf"])
+    if st.button("Generate ZIP", disabled=not (export_countries and export_formats)):
+        bar = st.progress(0.0, text="Rendering...")
+        buffer = io.BytesIO()
+        export_zip([country_pack(store, c) for c in export_countries], buffer, export_formats,
+                   progress=lambda done, total, name: bar.progress(done / total, text=f"{done}/{total} {name}"))
+        st.session_state["country_packs_zip"] = buffer.getvalue()
+    if "country_packs_zip" in st.session_state:
+        st.download_button("Download two-pagers (ZIP)", data=st.session_state["country_packs_zip"],
+                           file_name="country_two_pagers.zip", mime="application/zip")
+    if st.button("Generate regional compendium (PDF)", disabled=not export_countries):
+        with st.spinner("Rendering compendium..."):
+            buffer = io.BytesIO()
+            export_compendium(store, data['wca_summary'], export_countries, buffer)
+        st.session_state["compendium_pdf"] = buffer.getvalue()
+    if "compendium_pdf" in st.session_state:
+        st.download_button("Download compendium (PDF)", data=st.session_state["compendium_pdf"],
+                           file_name="wca_compendium.pdf", mime="application/pdf")
+finally:
+    finish_page(run)
@@ -1,74 +1,108 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.load_data import load_all
+from utils.load_data import load_datasets, derive, DATA_FILES
 from utils.auth import require_login
+from utils.profiling import start_page, finish_page
 from utils.formatting import justify, style_table
+from utils.figures import cached_figure
+from utils.derived import derived
+from utils.cube import CUBE_DATASETS, DIMENSIONS
+from utils.exports import FORMATS, available_formats, sheet, exporter, export_name, export_mime
+
+def execution_bar(cof):
+    import plotly.express as px
+    return px.bar(cof.sort_values("Execution Rate (%)", ascending=False), x='Country', y='Execution Rate (%)',
+                  title="Co-financing Execution (%) by Country")
+
+def autonomy_pie(counts):
+    import plotly.express as px
+    return px.pie(counts, values='Count', names='Autonomy Level', title='Procurement Agency Autonomy Levels')
 
 # BLOCK access if not logged in
 require_login()
+run = start_page("Cross-Country Comparison")
 
-st.title("Cross-Country Comparison")
-
-data = load_all()
-proc = data['procurement']
-pfm = data['pfm']
-qa = data['qa']
-cof = data['cofinancing']
-cpfm = data['cpfm']
-
-
-st.header("Procurement Table")
-selected_cols2 = st.multiselect("",proc.columns.tolist(), default=['Country', 'Dedicated Procurement Agency', 'Autonomy Level', 'HTM Procurement Guidelines'])
-if selected_cols2:
-    st.dataframe(proc[selected_cols2].set_index('Country'))
-
-st.markdown("Download cross-country table:")
-csv = proc.to_csv(index=False).encode()
-st.download_button("Download procurement CSV", data=csv, file_name="procurement_table.csv", mime="text/csv")
-
-st.header("PFM Execution Rate (Co-financing)")
-if 'Execution Rate (%)' in cof.columns:
-    cof['Execution Rate (%)'] = pd.to_numeric(cof['Execution Rate (%)'], errors='coerce')
-    fig = px.bar(cof.sort_values("Execution Rate (%)", ascending=False), x='Country', y='Execution Rate (%)',
-                 title="Co-financing Execution (%) by Country")
-    st.plotly_chart(fig, use_container_width=True)
-else:
-    st.info("No 'Execution Rate (%)' column in cofinancing dataset.")
-
-st.header("Autonomy Level Distribution")
-if 'Autonomy Level' in proc.columns:
-    counts = proc['Autonomy Level'].value_counts().reset_index()
-    counts.columns = ['Autonomy Level', 'Count']
-    fig2 = px.pie(counts, values='Count', names='Autonomy Level', title='Procurement Agency Autonomy Levels')
-    st.plotly_chart(fig2, use_container_width=True)
-
-# Filter + heatmap-like summary
-st.header("Summary Matrix (select columns to pivot)")
-selected_cols = st.multiselect("Columns (procurement)", proc.columns.tolist(), default=['Country', 'Autonomy Level', 'Dedicated Procurement Agency'])
-if selected_cols:
-    st.dataframe(proc[selected_cols].set_index('Country'))
-
-st.header("Comparative Analysis")
-
-# 1. Prepare the column configuration dictionary
-column_settings = {}
-# Get all column names from your DataFrame
-column_names = cpfm.columns
-
-# 2. Loop through all column names and configure them for wrapping
-for col in column_names:
-    column_settings[col] = st.column_config.TextColumn(
-        col,  # Use the column name as the label
-        width="medium",  # Use a consistent width for balance
-        # The key setting to allow wrapping and prevent truncation:
-        help=f"Details for the column: {col}" 
-    )
+try:
+    st.title("Cross-Country Comparison")
+
+    data = load_datasets("procurement", "pfm", "qa", "cofinancing", "cpfm")
+    proc = data['procurement']
+    pfm = data['pfm']
+    qa = data['qa']
+    cof = data['cofinancing']
+    cpfm = data['cpfm']
+
+
+    st.header("Procurement Table")
+    selected_cols2 = st.multiselect("",proc.columns.tolist(), default=['Country', 'Dedicated Procurement Agency', 'Autonomy Level', 'HTM Procurement Guidelines'])
+    countries = st.multiselect("Countries", proc['Country'].tolist(), default=proc['Country'].tolist())
+    if selected_cols2:
+        view = proc[proc['Country'].isin(countries)]
+        st.dataframe(view[selected_cols2].set_index('Country') if 'Country' in selected_cols2 else view[selected_cols2])
+
+    # Exports are encoded only when a download button is clicked, then cached
+    # by source version, columns and filters (see utils/exports.py)
+    st.markdown("Download cross-country tables:")
+    c1, c2 = st.columns([3, 1])
+    sources = c1.multiselect("Tables", ["Current view"] + list(DATA_FILES), default=["Current view"])
+    fmt = c2.selectbox("Format", available_formats(), format_func=lambda f: FORMATS[f][0])
+    sheets = [sheet("procurement_view", DATA_FILES["procurement"], selected_cols2,
+                    {"Country": None if len(countries) == len(proc) else countries})
+              if s == "Current view" else sheet(s, DATA_FILES[s]) for s in sources]
+    if sheets:
+        st.download_button(f"Download {FORMATS[fmt][0]}", data=exporter(sheets, fmt),
+                           file_name=export_name(sheets, fmt, None if len(sheets) == 1 else "cross_country_tables"),
+                           mime=export_mime(sheets, fmt))
+
+    st.header("PFM Execution Rate (Co-financing)")
+    if 'Execution Rate (%)' in cof.columns:
+        cof = derive(cof, {'Execution Rate (%)': pd.to_numeric(cof['Execution Rate (%)'], errors='coerce')})
+        fig = cached_figure("execution_rate", execution_bar, cof[['Country', 'Execution Rate (%)']])
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("No 'Execution Rate (%)' column in cofinancing dataset.")
 
-# 3. Display the DataFrame using the generated configuration
-st.dataframe(
-    cpfm,
-    column_config=column_settings, # Apply the settings to all columns
-    hide_index=True,
-    use_container_width=True # Ensure the table expands horizontally
-)
\ No newline at end of file
+    # Distributions and pivots come from the precomputed indicator cube (see utils/cube.py)
+    cube = derived.get('indicator_cube')
+
+    st.header("Autonomy Level Distribution")
+    if 'Autonomy Level' in cube.indicators('procurement'):
+        counts = cube.counts('procurement', 'Autonomy Level')
+        fig2 = cached_figure("autonomy", autonomy_pie, counts)
+        st.plotly_chart(fig2, use_container_width=True)
+
+    st.header("Summary Matrix (select indicators to pivot)")
+    c1, c2, c3 = st.columns(3)
+    dataset = c1.selectbox("Dataset", [d for d in CUBE_DATASETS if cube.indicators(d)])
+    indicators = cube.indicators(dataset)
+    rows = c2.selectbox("Rows", indicators)
+    columns = c3.selectbox("Columns", list(DIMENSIONS) + [i for i in indicators if i != rows],
+                           index=list(DIMENSIONS).index('income_level'), format_func=lambda c: DIMENSIONS.get(c, c))
+    income = st.multiselect("Income Level", cube.dims['income_level'], default=cube.dims['income_level'])
+    st.dataframe(cube.crosstab(dataset, rows, columns, income_level=income), use_container_width=True)
+
+    st.header("Comparative Analysis")
+
+    # 1. Prepare the column configuration dictionary
+    column_settings = {}
+    # Get all column names from your DataFrame
+    column_names = cpfm.columns
+
+    # 2. Loop through all column names and configure them for wrapping
+    for col in column_names:
+        column_settings[col] = st.column_config.TextColumn(
+            col,  # Use the column name as the label
+            width="medium",  # Use a consistent width for balance
+            # The key setting to allow wrapping and prevent truncation:
+            help=f"Details for the column: {col}" 
+        )
+
+    # 3. Display the DataFrame using the generated configuration
+    st.dataframe(
+        cpfm,
+        column_config=column_settings, # Apply the settings to all columns
+        hide_index=True,
+        use_container_width=True # Ensure the table expands horizontally
+    )
+finally:
+    finish_page(run)
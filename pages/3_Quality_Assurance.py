@@ -1,36 +1,39 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.load_data import load_all
+from utils.load_data import load_datasets, derive
 from utils.auth import require_login
+from utils.profiling import start_page, finish_page
+from utils.derived import derived
+from utils.figures import cached_figure
+
+def qa_bar(qa):
+    import plotly.express as px
+    return px.bar(qa.sort_values('QA Score', ascending=False), x='Country', y='QA Score', title='QA Readiness Score (0-5)')
 
 # BLOCK access if not logged in
 require_login()
+run = start_page("Quality Assurance")
 
-st.title("Quality Assurance")
-
-data = load_all()
-qa = data['qa']
+try:
+    st.title("Quality Assurance")
 
+    data = load_datasets("qa")
+    qa = data['qa']
 
-st.subheader("QA Table")
-selected_cols3 = st.multiselect("",qa.columns.tolist(), default=['Country', 'QA Policy Exists', 'Pre-shipment Testing', 'Post-market Surveillance'])
-if selected_cols3:
-    st.dataframe(qa[selected_cols3].set_index('Country'))
 
-st.subheader("QA Readiness Score (simple composite)")
-# compute a naive QA score
-def qa_score(row):
-    s = 1
-    s += 1 if str(row.get('QA Policy Exists','')).lower() == 'yes' else 0
-    s += 1 if str(row.get('Pre-shipment Testing','')).lower() in ['yes','partial'] else 0
-    s += 2 if str(row.get('Post-market Surveillance','')).lower() in ['moderate','strong'] else 0
-    return s
+    st.subheader("QA Table")
+    selected_cols3 = st.multiselect("",qa.columns.tolist(), default=['Country', 'QA Policy Exists', 'Pre-shipment Testing', 'Post-market Surveillance'])
+    if selected_cols3:
+        st.dataframe(qa[selected_cols3].set_index('Country'))
 
-qa['QA Score'] = qa.apply(qa_score, axis=1)
-fig = px.bar(qa.sort_values('QA Score', ascending=False), x='Country', y='QA Score', title='QA Readiness Score (0-5)')
-st.plotly_chart(fig, use_container_width=True)
+    st.subheader("QA Readiness Score (simple composite)")
+    # compute a naive QA score (rules in utils/scoring.py)
+    qa = derive(qa, {'QA Score': derived.get('qa_scores')})
+    fig = cached_figure("qa_score", qa_bar, qa[['Country', 'QA Score']])
+    st.plotly_chart(fig, use_container_width=True)
 
-st.markdown("""
-**Notes:** This QA score is illustrative.
-""")
+    st.markdown("""
+    **Notes:** This QA score is illustrative.
+    """)
+finally:
+    finish_page(run)
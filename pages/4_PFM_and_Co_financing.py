@@ -1,32 +1,54 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from utils.load_data import load_all
+from utils.load_data import load_datasets
 from utils.auth import require_login
+from utils.profiling import start_page, finish_page
+from utils.scoring import PFM_READINESS, COFINANCING_READINESS
+from utils.figures import cached_figure
+from utils.derived import derived
+
+def delays_bar(counts):
+    import plotly.express as px
+    return px.bar(counts, x='Payment Delays', y='count', title='Payment Delays Frequency (by category)')
+
+def readiness_bar(readiness):
+    import plotly.express as px
+    return px.bar(readiness, x='Country', y=['PFM Score', 'Co-financing Score'], barmode='group',
+                  title=f'Readiness Scores (PFM 0-{PFM_READINESS.max_score:.0f}, Co-financing 0-{COFINANCING_READINESS.max_score:.0f})')
 
 # BLOCK access if not logged in
 require_login()
+run = start_page("PFM & Co-financing")
+
+try:
+    st.title("PFM & Co-financing")
 
-st.title("PFM & Co-financing")
+    data = load_datasets("pfm", "cofinancing")
+    pfm = data['pfm']
+    cof = data['cofinancing']
 
-data = load_all()
-pfm = data['pfm']
-cof = data['cofinancing']
+    st.subheader("PFM Indicators")
+    selected_cols = st.multiselect("",pfm.columns.tolist(), default=['Country', 'Budget Allocation Timeliness', 'Payment Delays', 'Alignment with Procurement Cycle'])
+    if selected_cols:
+        st.dataframe(pfm[selected_cols].set_index('Country'))
 
-st.subheader("PFM Indicators")
-selected_cols = st.multiselect("",pfm.columns.tolist(), default=['Country', 'Budget Allocation Timeliness', 'Payment Delays', 'Alignment with Procurement Cycle'])
-if selected_cols:
-    st.dataframe(pfm[selected_cols].set_index('Country'))
 
+    st.subheader("Co-financing Execution")
+    selected_cols2 = st.multiselect("",cof.columns.tolist(), default=['Country', 'Execution Rate (%)', 'Risk of Non-Materialization'])
+    if selected_cols2:
+        st.dataframe(cof[selected_cols2].set_index('Country'))
 
-st.subheader("Co-financing Execution")
-selected_cols2 = st.multiselect("",cof.columns.tolist(), default=['Country', 'Execution Rate (%)', 'Risk of Non-Materialization'])
-if selected_cols2:
-    st.dataframe(cof[selected_cols2].set_index('Country'))
 
+    # Plot payment delays categories across countries (if exists)
+    cube = derived.get('indicator_cube')
+    if 'Payment Delays' in cube.indicators('pfm'):
+        counts = cube.counts('pfm', 'Payment Delays').rename(columns={'Count': 'count'})
+        fig = cached_figure("payment_delays", delays_bar, counts)
+        st.plotly_chart(fig, use_container_width=True)
 
-# Plot payment delays categories across countries (if exists)
-if 'Payment Delays' in pfm.columns:
-    counts = pfm.groupby(['Payment Delays']).size().reset_index(name='count')
-    fig = px.bar(counts, x='Payment Delays', y='count', title='Payment Delays Frequency (by category)')
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    st.subheader("PFM & Co-financing Readiness (simple composite)")
+    readiness = derived.get('readiness_scores')
+    fig2 = cached_figure("readiness", readiness_bar, readiness)
+    st.plotly_chart(fig2, use_container_width=True)
+finally:
+    finish_page(run)
@@ -0,0 +1,35 @@
+import streamlit as st
+from utils.auth import require_login
+from utils.profiling import start_page, finish_page
+from utils.derived import derived
+from utils.search import SEARCH_DATASETS
+
+# BLOCK access if not logged in
+require_login()
+run = start_page("Search")
+
+try:
+    st.title("Search Narratives")
+    st.markdown("Search the country narratives, procurement & PFM and budgeting notes, and the regional summaries. "
+                "Matching ignores accents and case, and the last word also matches longer words (e.g. `march` finds *Marchés*).")
+
+    # Inverted index built once per data version (see utils/search.py)
+    index = derived.get('search_index')
+
+    query = st.text_input("Search", placeholder="e.g. ARMP, marchés publics, stock-out")
+    c1, c2 = st.columns(2)
+    countries = c1.multiselect("Countries", index.countries)
+    sources = c2.multiselect("Sources", list(SEARCH_DATASETS), format_func=SEARCH_DATASETS.get)
+
+    if query.strip():
+        limit = 50
+        hits = index.search(query, limit=limit, countries=countries or None, datasets=sources or None)
+        if not hits:
+            st.info("No matches.")
+        else:
+            st.caption(f"Top {len(hits)} results" if len(hits) == limit else f"{len(hits)} results")
+        for hit in hits:
+            st.markdown(f"**{hit.country}** · {SEARCH_DATASETS[hit.dataset]} · *{hit.field}*")
+            st.markdown(hit.snippet, unsafe_allow_html=True)
+finally:
+    finish_page(run)
@@ -0,0 +1,32 @@
+# tests/test_cube.py
+import pandas as pd
+
+from utils.cube import IndicatorCube
+from utils.schema import LOW_MEDIUM_HIGH, ordinal
+
+COUNTRIES = pd.DataFrame({
+    "name": ["A", "B", "C"],
+    "region": ["WCA", "WCA", "WCA"],
+    "income_level": ["Low", "Low", "Lower-middle"],
+})
+
+def _cube():
+    procurement = pd.DataFrame({
+        "Country": ["A", "B", "C"],
+        "Autonomy Level": pd.Series(["Low", "Low", "High"], dtype=ordinal(LOW_MEDIUM_HIGH)),
+    })
+    return IndicatorCube({"procurement": procurement}, COUNTRIES)
+
+def test_crosstab_filter_out_of_order_keeps_headers_aligned():
+    cube = _cube()
+    table = cube.crosstab("procurement", "Autonomy Level", "income_level",
+                          income_level=["Lower-middle", "Low", "Low"])
+    assert list(table.columns) == ["Low", "Lower-middle"]
+    assert table.loc["Low", "Low"] == 2
+    assert table.loc["High", "Lower-middle"] == 1
+    assert table.loc["High", "Low"] == 0
+
+def test_counts_filter_matches_unfiltered_subset():
+    cube = _cube()
+    counts = cube.counts("procurement", "Autonomy Level", income_level=["Low"])
+    assert counts.set_index("Autonomy Level")["Count"].to_dict() == {"Low": 2, "Medium": 0, "High": 0}
@@ -0,0 +1,14 @@
+# tests/test_partitions.py
+from utils import partitions
+
+def test_later_decimal_prices_widen_the_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(partitions, "PARTITION_DIR", str(tmp_path / "parts"))
+    rows = [f"{i},1,2024-01-{i % 28 + 1:02d},200" for i in range(1, 6)] + \
+           [f"{i},1,2024-02-{i % 28 + 1:02d},201.55" for i in range(6, 11)]
+    source = tmp_path / "procurements.csv"
+    source.write_text("procurement_id,country_id,po_date,unit_price_local\n" + "\n".join(rows) + "\n")
+
+    partitions.build_partitions(str(source), ("po_date",), "po_date", chunksize=5)
+    df = partitions.read_partitioned(str(source), ("po_date",), "po_date").sort_values("procurement_id")
+    assert df["unit_price_local"].tolist() == [200.0] * 5 + [201.55] * 5
+    assert df["procurement_id"].tolist() == list(range(1, 11))
@@ -0,0 +1,42 @@
+# tests/test_uploads.py
+import io
+import zipfile
+
+from utils.uploads import read_upload
+
+def _zip(name, content="x"):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr(name, content)
+    return io.BytesIO(buf.getvalue())
+
+def test_zip_that_is_not_a_workbook_is_unsupported():
+    assert read_upload(_zip("word/document.xml")).error == "unsupported_format"
+
+def test_corrupt_workbook_is_a_parse_error():
+    assert read_upload(_zip("xl/workbook.xml", "<broken")).error == "parse_error"
+    assert read_upload(io.BytesIO(b"PK\x03\x04" + b"\x00" * 64)).error == "parse_error"
+
+def test_spilled_csv_matches_in_memory_types():
+    csv = ("a,b\n" + "".join(f"{i},x\n" for i in range(120)) + "text,y\n").encode()
+    in_memory = read_upload(io.BytesIO(csv), chunksize=50)
+    spilled = read_upload(io.BytesIO(csv), chunksize=50, spill_bytes=10)
+    try:
+        assert in_memory.ok and spilled.ok
+        assert spilled.spill_path is not None
+        assert spilled.df.equals(in_memory.df)
+    finally:
+        spilled.cleanup()
+
+def test_spilled_csv_is_parsed_once(monkeypatch):
+    import utils.uploads as uploads
+    calls = []
+    read_csv = uploads.pd.read_csv
+    monkeypatch.setattr(uploads.pd, "read_csv", lambda *a, **k: calls.append(1) or read_csv(*a, **k))
+    csv = ("a,b\n" + "".join(f"{i},{i / 2}\n" for i in range(120))).encode()
+    result = read_upload(io.BytesIO(csv), chunksize=50, spill_bytes=10)
+    try:
+        assert result.ok and result.spill_path is not None and len(result.df) == 120
+        assert len(calls) == 1
+    finally:
+        result.cleanup()
@@ -9,6 +9,9 @@ CREDENTIALS = {
     "analyst": "analystpass"
 }
 
+# Users who can see admin tools (e.g. the page profiler)
+ADMINS = {"admin"}
+
 # -----------------------
 # Hash function (optional)
 # -----------------------
@@ -36,6 +39,9 @@ def is_logged_in():
 def get_current_user():
     return st.session_state.get("auth", {}).get("user", "unknown")
 
+def is_admin():
+    return is_logged_in() and get_current_user() in ADMINS
+
 # -----------------------
 # PAGE PROTECTION
 # -----------------------
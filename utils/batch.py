@@ -0,0 +1,152 @@
+# utils/batch.py
+"""
+Headless batch run: everything the dashboard computes, done ahead of
+time so page reruns only read results.
+
+    python -m utils.batch                        # snapshots, derive, reports
+    python -m utils.batch derive                 # just the derived tables
+    python -m utils.batch reports --formats pdf  # just the country reports
+
+Run from the repository root (e.g. nightly from cron). Derived tables
+are written to the DAG's output store (utils/dag.py), where the web app
+finds them under the same keys it would compute them under; reports go
+to REPORT_DIR, one directory per data version. Neither Streamlit nor
+Plotly is imported.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+from utils.dag import file_fingerprint
+from utils.datasets import DATA_FILES
+from utils.derived import derived, GRID_STEPS, DIRICHLET_DEFAULTS, SIM_SEED, SIM_PRECOMPUTED
+from utils.ingest import REGIONAL_FILES, PO_DATES
+from utils.partitions import ensure_partitions
+from utils.reports import TEMPLATE_VERSION, country_pack, export_zip, export_compendium
+from utils.snapshot import load_snapshot
+
+REPORT_DIR = os.environ.get("HTM_REPORT_DIR", "data/.reports")
+REPORT_FORMATS = ("docx", "pdf")
+PACKS_ZIP = "country_two_pagers.zip"
+COMPENDIUM = "wca_compendium.pdf"
+
+# -----------------------
+# STEPS
+# -----------------------
+def refresh_snapshots() -> int:
+    """
+    Rebuild any stale Arrow snapshot and partitioned copy of the source
+    files. Returns the number of sources checked.
+    """
+    for path in DATA_FILES.values():
+        load_snapshot(path)
+    ensure_partitions(REGIONAL_FILES["procurements"], PO_DATES, "po_date")
+    ensure_partitions(REGIONAL_FILES["budgets"])
+    return len(DATA_FILES) + 2
+
+def derived_requests():
+    """
+    (node, params) of every derived table the pages ask for with their
+    default or listed choices, with params spelled as the pages spell
+    them so the keys match.
+    """
+    requests = [(name, {}) for name in ("kpis", "pooled_stats", "transaction_years", "qa_scores",
+                                        "readiness_scores", "country_store", "search_index", "indicator_cube")]
+    requests += [("risk_sensitivity", dict(method="grid", step=step)) for step in GRID_STEPS]
+    requests.append(("risk_sensitivity", dict(method="dirichlet", **DIRICHLET_DEFAULTS)))
+    countries = derived.get("kpis")["country_id"].astype(int).tolist()
+    years = derived.get("transaction_years")
+    for n in SIM_PRECOMPUTED:
+        requests += [("risk_simulation", dict(country_id=c, n=n, seed=SIM_SEED)) for c in [None] + countries]
+    for c in countries:
+        requests.append(("transactions", dict(country_id=c, year=None)))
+        requests += [("transactions", dict(country_id=c, year=int(y)))
+                     for y in years.loc[years["country_id"] == c, "year"]]
+    return requests
+
+def precompute() -> int:
+    """
+    Compute (or load) every derived table in derived_requests(), which
+    writes it to the output store. Returns the number of tables.
+    """
+    requests = derived_requests()
+    for name, params in requests:
+        derived.get(name, **params)
+    return len(requests)
+
+def report_version(formats=REPORT_FORMATS) -> str:
+    # Reports depend on the country store and, for the compendium, the
+    # regional summary; the template and the formats in the ZIP are part
+    # of the key so a layout change or a partial run is never served as
+    # the full set
+    parts = [derived.key("country_store"), file_fingerprint(DATA_FILES["wca_summary"]),
+             str(TEMPLATE_VERSION), ",".join(sorted(set(formats)))]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()[:16]
+
+def report_dir(formats=REPORT_FORMATS) -> str:
+    return os.path.join(REPORT_DIR, report_version(formats))
+
+def prebuilt_reports() -> dict:
+    """
+    File name -> path of the reports a batch run rendered in every
+    REPORT_FORMATS for the current data and template, if any.
+    """
+    root = report_dir()
+    return {name: os.path.join(root, name) for name in (PACKS_ZIP, COMPENDIUM)
+            if os.path.exists(os.path.join(root, name))}
+
+def render_reports(formats=REPORT_FORMATS, workers=None) -> int:
+    """
+    Render every country's two-pager in formats into one ZIP, and the
+    regional compendium, under report_dir(formats). Each file is written
+    beside its final name and renamed into place. Returns the number of
+    countries.
+    """
+    store = derived.get("country_store")
+    root = report_dir(formats)
+    os.makedirs(root, exist_ok=True)
+    tmp = os.path.join(root, f".{PACKS_ZIP}.{os.getpid()}.tmp")
+    export_zip([country_pack(store, c) for c in store.countries], tmp, formats, workers)
+    os.replace(tmp, os.path.join(root, PACKS_ZIP))
+    tmp = os.path.join(root, f".{COMPENDIUM}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        export_compendium(store, load_snapshot(DATA_FILES["wca_summary"]), store.countries, f)
+    os.replace(tmp, os.path.join(root, COMPENDIUM))
+    return len(store.countries)
+
+STEPS = {
+    "snapshots": lambda args: refresh_snapshots(),
+    "derive": lambda args: precompute(),
+    "reports": lambda args: render_reports(args.formats, args.workers),
+}
+
+# -----------------------
+# CLI
+# -----------------------
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("steps", nargs="*", metavar="step",
+                        help=f"{', '.join(STEPS)} (default: all, always run in that order)")
+    parser.add_argument("--formats", nargs="+", choices=REPORT_FORMATS, default=list(REPORT_FORMATS))
+    parser.add_argument("--workers", type=int, help="report rendering processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+    unknown = [s for s in args.steps if s not in STEPS]
+    if unknown:
+        parser.error(f"unknown step(s): {', '.join(unknown)}")
+
+    failed = False
+    for step in [s for s in STEPS if s in (args.steps or STEPS)]:
+        start = time.perf_counter()
+        try:
+            count = STEPS[step](args)
+        except Exception as e:
+            failed = True
+            print(f"{step:<10} FAILED  {type(e).__name__}: {e}", file=sys.stderr)
+            continue
+        print(f"{step:<10} {count:>6}  {time.perf_counter() - start:8.2f}s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
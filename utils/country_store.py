@@ -0,0 +1,76 @@
+# utils/country_store.py
+import unicodedata
+
+import pandas as pd
+
+COUNTRY_DATASETS = ["procurement", "pfm", "qa", "cofinancing", "ctexts", "cpfm", "budgeting"]
+
+class CountryStore:
+    """
+    Country-keyed records of every country-level dataset, built once per
+    data version so a profile lookup is a dictionary access.
+
+    Records are keyed by (country, year). Datasets without a "Year"
+    column are stored under year None and returned for any year.
+    """
+    def __init__(self, frames: dict):
+        self.records = {}
+        self.issues = []
+        self.countries = []
+        seen = set()
+        for name, df in frames.items():
+            if df is None or df.empty or "Country" not in df.columns:
+                self.issues.append(f"{name}: no Country column or no rows")
+                continue
+            country = df["Country"].astype(str).str.strip()
+            year = df["Year"] if "Year" in df.columns else pd.Series([None] * len(df), index=df.index)
+            values = df.drop(columns=[c for c in ("Country", "Year") if c in df.columns])
+            keys = list(zip(country, year))
+            dupes = pd.Index(keys).duplicated()
+            if dupes.any():
+                self.issues.append(f"{name}: duplicate rows for {sorted({k[0] for k, d in zip(keys, dupes) if d})}")
+            for key, (_, row) in zip(keys, values.iterrows()):
+                self.records.setdefault(key, {}).setdefault(name, row)
+            for c in country:
+                if c not in seen:
+                    seen.add(c)
+                    self.countries.append(c)
+        self.datasets = [n for n in frames if any(n in r for r in self.records.values())]
+        self.issues += self._check()
+
+    def _check(self):
+        """
+        Join consistency: every country should appear in every dataset,
+        and names should not differ only by case or accents.
+        """
+        issues = []
+        present = {}
+        for (country, _), rows in self.records.items():
+            present.setdefault(country, set()).update(rows)
+        for country, names in present.items():
+            missing = [n for n in self.datasets if n not in names]
+            if missing:
+                issues.append(f"{country}: missing from {', '.join(missing)}")
+        folded = {}
+        for country in present:
+            folded.setdefault(_fold(country), []).append(country)
+        for variants in folded.values():
+            if len(variants) > 1:
+                issues.append(f"Country name variants: {', '.join(sorted(variants))}")
+        return issues
+
+    def profile(self, country, year=None) -> dict:
+        """
+        Dataset name -> row (a Series without Country/Year) for a country.
+        Year-specific rows take precedence over undated ones.
+        """
+        rows = dict(self.records.get((country, None), {}))
+        if year is not None:
+            rows.update(self.records.get((country, year), {}))
+        return rows
+
+    def row(self, country, dataset, year=None) -> pd.Series:
+        return self.profile(country, year).get(dataset, pd.Series(dtype=object))
+
+def _fold(name: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c)).casefold()
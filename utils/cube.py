@@ -0,0 +1,199 @@
+# utils/cube.py
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Indicator datasets summarised by the cube
+CUBE_DATASETS = ("procurement", "pfm", "qa", "cofinancing")
+
+# Dimensions every count is broken down by, and how they are labelled
+DIMENSIONS = {
+    "country_group": "Country Group",
+    "income_level": "Income Level",
+    "year": "Year",
+}
+UNKNOWN = "Unknown"    # country missing from the regional countries table
+UNDATED = "Undated"    # row of a dataset without a Year column
+MISSING = "(missing)"  # indicator value that is not reported
+MAX_LEVELS = 20        # a text column with more distinct values is not categorical
+
+# -----------------------
+# ENCODING
+# -----------------------
+def _encode(s: pd.Series):
+    # Integer codes and labels of a column; ordered categoricals keep
+    # their level order (and unused levels), missing values take the
+    # trailing MISSING slot
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        labels = [str(c) for c in s.cat.categories]
+        codes = s.cat.codes.to_numpy()
+    else:
+        codes, uniques = pd.factorize(s.astype("string").str.strip(), sort=True)
+        labels = [str(u) for u in uniques]
+    codes = np.where(codes < 0, len(labels), codes)
+    return codes.astype(np.int64), labels + [MISSING]
+
+def categorical_columns(df: pd.DataFrame) -> list:
+    """
+    Indicator columns of df the cube counts: categoricals, and text
+    columns with at most MAX_LEVELS distinct values.
+    """
+    out = []
+    for c in df.columns:
+        if c in ("Country", "Year"):
+            continue
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            out.append(c)
+        elif not pd.api.types.is_numeric_dtype(s) and s.nunique() <= MAX_LEVELS:
+            out.append(c)
+    return out
+
+# -----------------------
+# CUBE
+# -----------------------
+class IndicatorCube:
+    """
+    Counts of every categorical indicator value, and of every pair of
+    values within a dataset, by country group, income level and year.
+
+    Each indicator is a dense array of counts with one axis for its
+    values and one per dimension; each pair of indicators adds a second
+    value axis. The arrays are built once per data version (see
+    derived.indicator_cube) with one bincount each, and a distribution
+    or crosstab is then a slice and sum of a few hundred cells instead
+    of a groupby over the raw rows.
+    """
+    def __init__(self, frames: dict, countries: pd.DataFrame):
+        groups = countries.set_index("name")
+        self.dims = {}        # dimension -> labels
+        self.levels = {}      # (dataset, column) -> labels, MISSING last
+        self._counts = {}     # (dataset, column) -> values x dims
+        self._pairs = {}      # (dataset, a, b) -> a values x b values x dims
+
+        rows = []
+        for dataset, df in frames.items():
+            names = df["Country"].astype("string").str.strip()
+            rows.append(pd.DataFrame({
+                "dataset": dataset,
+                "country_group": names.map(groups["region"]).fillna(UNKNOWN).astype(str).to_numpy(),
+                "income_level": names.map(groups["income_level"]).fillna(UNKNOWN).astype(str).to_numpy(),
+                "year": (df["Year"].astype("string").fillna(UNDATED).to_numpy() if "Year" in df.columns
+                         else np.full(len(df), UNDATED)),
+            }))
+        keys = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=["dataset", *DIMENSIONS])
+        dim_codes = {}
+        for dim in DIMENSIONS:
+            codes, labels = pd.factorize(keys[dim], sort=True)
+            dim_codes[dim] = codes.astype(np.int64)
+            self.dims[dim] = [str(l) for l in labels]
+        shape = tuple(len(self.dims[d]) for d in DIMENSIONS)
+        # One flat cell index over all dimensions per row
+        cell = np.ravel_multi_index(tuple(dim_codes[d] for d in DIMENSIONS), shape) if len(keys) else np.zeros(0, np.int64)
+
+        offset = 0
+        for dataset, df in frames.items():
+            rows = cell[offset:offset + len(df)]
+            offset += len(df)
+            encoded = {c: _encode(df[c]) for c in categorical_columns(df)}
+            for c, (codes, labels) in encoded.items():
+                self.levels[dataset, c] = labels
+                self._counts[dataset, c] = self._bincount((codes,), (len(labels),), rows, shape)
+            for a, b in combinations(encoded, 2):
+                (ca, la), (cb, lb) = encoded[a], encoded[b]
+                self._pairs[dataset, a, b] = self._bincount((ca, cb), (len(la), len(lb)), rows, shape)
+
+    @staticmethod
+    def _bincount(codes, sizes, cells, shape) -> np.ndarray:
+        full = sizes + shape
+        flat = np.ravel_multi_index(codes, sizes) * int(np.prod(shape)) + cells
+        return np.bincount(flat, minlength=int(np.prod(full))).reshape(full)
+
+    # -----------------------
+    # QUERIES
+    # -----------------------
+    def indicators(self, dataset=None) -> list:
+        """
+        (dataset, column) of every indicator in the cube, or the columns
+        of one dataset.
+        """
+        if dataset is None:
+            return list(self.levels)
+        return [c for d, c in self.levels if d == dataset]
+
+    def _positions(self, dim, filters):
+        # Positions of the filtered labels of dim, in level order and
+        # without repeats, so counts and headers line up; None = all
+        wanted = filters.get(dim)
+        if wanted is None:
+            return None
+        wanted = {str(v) for v in wanted}
+        return [i for i, label in enumerate(self.dims[dim]) if label in wanted]
+
+    def _select(self, counts, lead, filters, keep=None):
+        # Restrict each dimension axis to the filtered labels, then sum
+        # every dimension axis except keep
+        for i, dim in enumerate(DIMENSIONS):
+            idx = self._positions(dim, filters)
+            if idx is not None:
+                counts = np.take(counts, idx, axis=lead + i)
+        drop = tuple(lead + i for i, d in enumerate(DIMENSIONS) if d != keep)
+        return counts.sum(axis=drop)
+
+    def _dim_labels(self, dim, filters):
+        idx = self._positions(dim, filters)
+        labels = self.dims[dim]
+        return labels if idx is None else [labels[i] for i in idx]
+
+    def _pair(self, dataset, a, b) -> np.ndarray:
+        if (dataset, a, b) in self._pairs:
+            return self._pairs[dataset, a, b]
+        if (dataset, b, a) in self._pairs:
+            return np.swapaxes(self._pairs[dataset, b, a], 0, 1)
+        raise KeyError(f"No indicators {a!r} and {b!r} in dataset {dataset!r}.")
+
+    def _labels(self, dataset, column):
+        try:
+            return self.levels[dataset, column]
+        except KeyError:
+            raise KeyError(f"No categorical indicator {column!r} in dataset {dataset!r}.") from None
+
+    def counts(self, dataset, column, dropna=True, **filters) -> pd.DataFrame:
+        """
+        How many countries report each value of column, as a frame with
+        column and Count, in level order. Keyword filters restrict a
+        dimension to a list of labels, e.g. income_level=["Low"].
+        """
+        labels = self._labels(dataset, column)
+        counts = self._select(self._counts[dataset, column], 1, filters)
+        out = pd.DataFrame({column: labels, "Count": counts})
+        return out.iloc[:-1] if dropna else out[(out[column] != MISSING) | (out["Count"] > 0)]
+
+    def crosstab(self, dataset, rows, columns, dropna=True, **filters) -> pd.DataFrame:
+        """
+        Counts of rows values (index) against columns values. Either may
+        be another indicator of the same dataset or a dimension name
+        (country_group, income_level, year).
+        """
+        if rows in DIMENSIONS and columns in DIMENSIONS:
+            raise ValueError("A crosstab needs at least one indicator.")
+        if rows in DIMENSIONS:
+            return self.crosstab(dataset, columns, rows, dropna, **filters).T
+        row_labels = self._labels(dataset, rows)
+        if columns in DIMENSIONS:
+            table = self._select(self._counts[dataset, rows], 1, filters, keep=columns)
+            col_labels = self._dim_labels(columns, filters)
+        else:
+            col_labels = self._labels(dataset, columns)
+            table = self._select(self._pair(dataset, rows, columns), 2, filters)
+        out = pd.DataFrame(table, index=pd.Index(row_labels, name=rows), columns=pd.Index(col_labels, name=DIMENSIONS.get(columns, columns)))
+        if dropna:
+            out = out.drop(index=MISSING, errors="ignore").drop(columns=MISSING, errors="ignore")
+        else:
+            out = out.loc[(out.index != MISSING) | (out.sum(axis=1) > 0),
+                          (out.columns != MISSING) | (out.sum(axis=0) > 0)]
+        return out
+
+def build_cube(frames: dict, countries: pd.DataFrame) -> IndicatorCube:
+    return IndicatorCube({k: frames[k] for k in CUBE_DATASETS if k in frames}, countries)
@@ -0,0 +1,220 @@
+# utils/dag.py
+import hashlib
+import marshal
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+from utils.metrics import record_cache, timer
+
+DERIVED_DIR = os.environ.get("HTM_DERIVED_DIR", "data/.derived")
+DERIVED_MAX_BYTES = 1024 * 1024 * 1024   # least recently used outputs are deleted beyond this
+
+# -----------------------
+# SOURCE FINGERPRINTS
+# -----------------------
+_file_hashes = {}
+
+def file_fingerprint(path) -> str:
+    """
+    Content hash of a source file. The hash is only recomputed when the
+    file's mtime or size changes, so an unchanged file costs one stat().
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return "missing"
+    key = (path, st.st_mtime_ns, st.st_size)
+    h = _file_hashes.get(key)
+    if h is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        h = sha.hexdigest()
+        _file_hashes[key] = h
+    return h
+
+def _code_hash(func) -> str:
+    return hashlib.sha256(marshal.dumps(func.__code__)).hexdigest()
+
+def package_version() -> str:
+    """
+    Content hash of every module in this package.
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    sha = hashlib.sha256()
+    for name in sorted(os.listdir(root)):
+        if name.endswith(".py"):
+            sha.update(name.encode())
+            sha.update(file_fingerprint(os.path.join(root, name)).encode())
+    return sha.hexdigest()
+
+# -----------------------
+# PERSISTED OUTPUTS
+# -----------------------
+class OutputStore:
+    """
+    Node results pickled to disk by key, so a value computed by one
+    process (a batch run, or another server worker) is loaded by the
+    others instead of recomputed. A key changes whenever a node's code,
+    sources, dependencies or parameters do. Node keys do not cover the
+    helpers a node calls, so stored values are also tied to the source
+    of the whole utils package: a deploy that changes any of it
+    recomputes everything once. Old values are only ever evicted.
+    """
+    def __init__(self, root=DERIVED_DIR, max_bytes=DERIVED_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.version = package_version()
+
+    def _path(self, name, key):
+        key = hashlib.sha256(f"{key}\x1f{self.version}".encode()).hexdigest()
+        return os.path.join(self.root, f"{name}-{key}.pkl")
+
+    def load(self, name, key):
+        """
+        The stored value, or None if there is none (or it is unreadable).
+        """
+        path = self._path(name, key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def save(self, name, key, value):
+        """
+        Store value, replacing the file atomically. A read-only store or
+        an unpicklable value is skipped.
+        """
+        path = self._path(name, key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self._prune(keep=path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _prune(self, keep):
+        files = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".pkl"):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                os.remove(path)
+                total -= size
+
+# -----------------------
+# GRAPH
+# -----------------------
+class Node:
+    def __init__(self, name, func, deps=(), sources=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.sources = tuple(sources)
+        self.code = _code_hash(func)
+
+class DAG:
+    """
+    Derived tables declared as nodes over source files and other nodes.
+
+    A node's key hashes its code, the content of its source files, the
+    keys of its dependencies and any call parameters. Results are
+    memoized by key, so when a source file changes only the nodes
+    downstream of it get a new key and are recomputed; everything else
+    is a dictionary lookup. Results are shared between sessions and
+    must be treated as read-only.
+
+    With a store, a memo miss is first looked up on disk and computed
+    results are written there, which is how a batch run (utils/batch.py)
+    hands precomputed tables to the web app.
+    """
+    def __init__(self, max_entries=256, store=None):
+        self.nodes = {}
+        self.max_entries = max_entries
+        self.store = store
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def node(self, name=None, deps=(), sources=()):
+        """
+        Decorator registering func as a node. The function receives the
+        values of deps as positional arguments, then any parameters.
+        """
+        def register(func):
+            self.nodes[name or func.__name__] = Node(name or func.__name__, func, deps, sources)
+            return func
+        return register
+
+    def key(self, name, **params) -> str:
+        node = self.nodes[name]
+        parts = [name, node.code]
+        parts += [file_fingerprint(p) for p in node.sources]
+        parts += [self.key(d) for d in node.deps]
+        parts += [f"{k}={params[k]!r}" for k in sorted(params)]
+        return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+    def get(self, name, **params):
+        key = self.key(name, **params)
+        with self._lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                record_cache("derived", True)
+                return self._memo[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Only one session computes a given key; the others wait for it
+        with key_lock:
+            with self._lock:
+                if key in self._memo:
+                    record_cache("derived", True)
+                    return self._memo[key]
+            record_cache("derived", False)
+            value = self.store.load(name, key) if self.store else None
+            if self.store:
+                record_cache("derived_store", value is not None)
+            if value is None:
+                node = self.nodes[name]
+                deps = [self.get(d) for d in node.deps]
+                with timer(f"derive:{name}"):
+                    value = node.func(*deps, **params)
+                if self.store:
+                    self.store.save(name, key, value)
+            with self._lock:
+                self._memo[key] = value
+                self._key_locks.pop(key, None)
+                while len(self._memo) > self.max_entries:
+                    self._memo.popitem(last=False)
+        return value
+
+    def downstream(self, source):
+        """
+        Names of the nodes that would be recomputed if source changed.
+        """
+        hit = {n for n, node in self.nodes.items() if source in node.sources}
+        changed = True
+        while changed:
+            changed = False
+            for n, node in self.nodes.items():
+                if n not in hit and hit.intersection(node.deps):
+                    hit.add(n)
+                    changed = True
+        return sorted(hit)
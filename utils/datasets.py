@@ -0,0 +1,14 @@
+# utils/datasets.py
+# Source files of the indicator datasets. Kept apart from load_data,
+# which needs Streamlit, so headless code (derived tables, batch runs)
+# can name them.
+DATA_FILES = {
+    "procurement": "data/procurement.csv",
+    "pfm": "data/pfm.csv",
+    "qa": "data/qa.csv",
+    "cofinancing": "data/cofinancing.csv",
+    "ctexts": "data/ctexts.csv",
+    "cpfm": "data/cpfm.csv",
+    "wca_summary": "data/wca_summary.csv",
+    "budgeting": "data/budgeting.csv"
+}
@@ -0,0 +1,131 @@
+# utils/derived.py
+import pandas as pd
+
+from utils.dag import DAG, OutputStore
+from utils.ingest import (REGIONAL_FILES, load_dimensions, compute_kpis, compute_distributions, country_transactions,
+                          po_years)
+from utils.datasets import DATA_FILES
+from utils.snapshot import load_snapshot
+from utils.scoring import score, QA_READINESS, PFM_READINESS, COFINANCING_READINESS
+from utils.montecarlo import distribution_params, simulate
+from utils.country_store import CountryStore, COUNTRY_DATASETS
+from utils.sensitivity import weight_grid, dirichlet_weights, sweep
+from utils.search import SEARCH_DATASETS, build_index
+from utils.cube import CUBE_DATASETS, build_cube
+
+derived = DAG(store=OutputStore())
+
+RISK_WEIGHTS = {
+    "lead_time_days": 0.4,
+    "payment_delay_days": 0.3,
+    "price_variance_pct": 0.2,
+    "stockout": 0.1,  # 1 - fulfillment_rate
+}
+
+# Choices the pages offer, shared with the batch run so it precomputes
+# exactly the keys the pages request
+GRID_STEPS = [0.1, 0.05, 0.025, 0.02]
+DIRICHLET_DEFAULTS = dict(n=10_000, alpha=1.0)
+SIM_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+SIM_PRECOMPUTED = [100_000, 1_000_000]
+SIM_SEED = 42
+
+# -----------------------
+# REGIONAL PROCUREMENT
+# -----------------------
+@derived.node(sources=[REGIONAL_FILES[k] for k in ("countries", "products", "benchmarks", "budgets", "fx_rates")])
+def dimensions():
+    return load_dimensions()
+
+@derived.node(deps=["dimensions"], sources=[REGIONAL_FILES["procurements"]])
+def kpi_stream(dims):
+    kpis, acc = compute_kpis(dims)
+    return kpis, acc.pooled()
+
+@derived.node(deps=["kpi_stream"])
+def pooled_stats(stream):
+    return stream[1]
+
+def risk_components(kpis) -> pd.DataFrame:
+    """
+    The RISK_WEIGHTS components, each divided by its maximum across
+    countries.
+    """
+    parts = pd.DataFrame({
+        "lead_time_days": kpis["lead_time_days"],
+        "payment_delay_days": kpis["payment_delay_days"],
+        "price_variance_pct": kpis["price_variance_pct"],
+        "stockout": 1 - kpis["fulfillment_rate"],
+    })
+    return parts / parts.max()
+
+def risk_score(kpis, weights=RISK_WEIGHTS):
+    """
+    Simple normalized composite risk score: each KPI is divided by its
+    maximum across countries and weighted.
+    """
+    parts = risk_components(kpis)
+    return sum(parts[k] * w for k, w in weights.items())
+
+@derived.node(deps=["kpi_stream"])
+def kpis(stream):
+    return stream[0].assign(risk_score=lambda k: risk_score(k))
+
+@derived.node(deps=["kpis"])
+def risk_sensitivity(kpis, method="grid", step=0.05, n=10_000, alpha=1.0, seed=0):
+    """
+    Country risk rankings under many weightings of RISK_WEIGHTS: a
+    simplex grid with the given step, or n Dirichlet(alpha) samples.
+    """
+    components = risk_components(kpis)
+    k = len(components.columns)
+    weights = weight_grid(k, step) if method == "grid" else dirichlet_weights(k, n, alpha, seed)
+    return sweep(components, weights, RISK_WEIGHTS, index=kpis["name"])
+
+@derived.node(deps=["dimensions"], sources=[REGIONAL_FILES["procurements"]])
+def transactions(dims, country_id, year=None):
+    return country_transactions(country_id, dims, years=None if year is None else [year])
+
+@derived.node(sources=[REGIONAL_FILES["procurements"]])
+def transaction_years():
+    return po_years()
+
+@derived.node(deps=["dimensions"], sources=[REGIONAL_FILES["procurements"]])
+def risk_distributions(dims):
+    return compute_distributions(dims)
+
+@derived.node(deps=["risk_distributions"])
+def risk_simulation(dists, country_id=None, n=100_000, seed=42):
+    return simulate(distribution_params(dists, country_id), n, seed=seed)
+
+# -----------------------
+# INDICATOR SCORES
+# -----------------------
+@derived.node(sources=[DATA_FILES["qa"]])
+def qa_scores():
+    return score(load_snapshot(DATA_FILES["qa"]), QA_READINESS)
+
+@derived.node(sources=[DATA_FILES["pfm"], DATA_FILES["cofinancing"]])
+def readiness_scores():
+    pfm, cof = load_snapshot(DATA_FILES["pfm"]), load_snapshot(DATA_FILES["cofinancing"])
+    return pd.DataFrame({"Country": pfm["Country"], "PFM Score": score(pfm, PFM_READINESS)}).merge(
+        pd.DataFrame({"Country": cof["Country"], "Co-financing Score": score(cof, COFINANCING_READINESS)}),
+        on="Country", how="outer")
+
+@derived.node(deps=["dimensions"], sources=[DATA_FILES[k] for k in CUBE_DATASETS])
+def indicator_cube(dims):
+    return build_cube({k: load_snapshot(DATA_FILES[k]) for k in CUBE_DATASETS}, dims[0])
+
+# -----------------------
+# COUNTRY PROFILES
+# -----------------------
+@derived.node(sources=[DATA_FILES[k] for k in COUNTRY_DATASETS])
+def country_store():
+    return CountryStore({k: load_snapshot(DATA_FILES[k]) for k in COUNTRY_DATASETS})
+
+# -----------------------
+# FULL-TEXT SEARCH
+# -----------------------
+@derived.node(sources=[DATA_FILES[k] for k in SEARCH_DATASETS])
+def search_index():
+    return build_index({k: load_snapshot(DATA_FILES[k]) for k in SEARCH_DATASETS})
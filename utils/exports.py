@@ -0,0 +1,245 @@
+# utils/exports.py
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from dataclasses import dataclass
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from utils.dag import file_fingerprint
+from utils.metrics import record_cache, timer
+from utils.snapshot import snapshot_table
+
+EXPORT_DIR = os.environ.get("HTM_EXPORT_DIR", "data/.exports")
+EXPORT_VERSION = 1
+EXPORT_MAX_BYTES = 512 * 1024 * 1024   # older exports are deleted beyond this
+CHUNKSIZE = 50_000                     # rows converted and written at a time
+EXCEL_MAX_ROWS = 1_048_575             # data rows per worksheet; longer sheets continue on a new one
+
+# format -> (label, extension, mime type, module it needs)
+FORMATS = {
+    "csv": ("CSV", "csv", "text/csv", None),
+    "xlsx": ("Excel", "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "openpyxl"),
+    "parquet": ("Parquet", "parquet", "application/vnd.apache.parquet", "pyarrow.parquet"),
+}
+ZIP_MIME = "application/zip"
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+# -----------------------
+# REQUESTS
+# -----------------------
+@dataclass(frozen=True)
+class Sheet:
+    """
+    One table of an export: a DATA_FILES source narrowed to some columns
+    (None = all) and to the rows whose value in each filter column is
+    one of the listed values.
+    """
+    name: str
+    path: str
+    columns: tuple = None
+    filters: tuple = ()   # ((column, (value, ...)), ...), sorted
+
+def sheet(name, path, columns=None, filters=None) -> Sheet:
+    """
+    A Sheet from plain lists and a {column: values} dict. Filters set to
+    None are ignored.
+    """
+    filters = {c: v for c, v in (filters or {}).items() if v is not None}
+    return Sheet(name, path, tuple(columns) if columns else None,
+                 tuple(sorted((c, tuple(sorted(str(x) for x in v))) for c, v in filters.items())))
+
+def available_formats() -> list:
+    """
+    The FORMATS whose writer is installed.
+    """
+    return [f for f, (*_, module) in FORMATS.items() if module is None or importlib.util.find_spec(module.split(".")[0])]
+
+def export_key(sheets, fmt) -> str:
+    """
+    Cache key of an export: the source versions, columns and filters of
+    every sheet and the format.
+    """
+    parts = [EXPORT_VERSION, fmt] + [[s.name, file_fingerprint(s.path), s.columns, s.filters] for s in sheets]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+def _zipped(sheets, fmt) -> bool:
+    # CSV and Parquet hold one table, so several sheets go in a zip
+    return len(sheets) > 1 and fmt != "xlsx"
+
+def export_name(sheets, fmt, stem=None) -> str:
+    stem = stem or (sheets[0].name if len(sheets) == 1 else "export")
+    return f"{stem}.zip" if _zipped(sheets, fmt) else f"{stem}.{FORMATS[fmt][1]}"
+
+def export_mime(sheets, fmt) -> str:
+    return ZIP_MIME if _zipped(sheets, fmt) else FORMATS[fmt][2]
+
+# -----------------------
+# READING
+# -----------------------
+def _filter(schema, filters):
+    expr = None
+    for column, values in filters:
+        kind = schema.field(column).type
+        if pa.types.is_dictionary(kind):
+            kind = kind.value_type
+        e = ds.field(column).isin(pa.array(values).cast(kind))
+        expr = e if expr is None else expr & e
+    return expr
+
+def iter_batches(s: Sheet, chunksize=CHUNKSIZE):
+    """
+    The rows of a sheet as Arrow record batches of up to chunksize rows.
+    The source is the memory-mapped snapshot, so only the batch being
+    written is ever materialized.
+    """
+    table = snapshot_table(s.path)
+    columns = list(s.columns) if s.columns else table.column_names
+    yield from ds.dataset(table).to_batches(columns=columns, filter=_filter(table.schema, s.filters),
+                                            batch_size=chunksize)
+
+# -----------------------
+# WRITERS
+# -----------------------
+def _write_csv(sheet, out, chunksize):
+    with open(out, "w", encoding="utf-8", newline="") as f:
+        header = True
+        for batch in iter_batches(sheet, chunksize):
+            batch.to_pandas().to_csv(f, index=False, header=header)
+            header = False
+        if header:
+            columns = list(sheet.columns) if sheet.columns else snapshot_table(sheet.path).column_names
+            csv.writer(f).writerow(columns)
+
+def _write_parquet(sheet, out, chunksize):
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for batch in iter_batches(sheet, chunksize):
+            if writer is None:
+                writer = pq.ParquetWriter(out, batch.schema)
+            writer.write_batch(batch, row_group_size=chunksize)
+        if writer is None:
+            table = snapshot_table(sheet.path)
+            pq.write_table(table.select(list(sheet.columns) if sheet.columns else table.column_names).slice(0, 0), out)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _cell(v):
+    # openpyxl takes None for empty cells, and plain strings for categories
+    if v is None or v != v:
+        return None
+    return v if isinstance(v, (int, float, bool, str)) else str(v)
+
+def _write_xlsx(sheets, out, chunksize):
+    from openpyxl import Workbook
+    # Write-only mode streams rows to disk instead of keeping every cell
+    wb = Workbook(write_only=True)
+    used = set()
+
+    def new_sheet(name, columns):
+        title = name[:31]
+        n = 2
+        while title.lower() in used:
+            suffix = f" ({n})"
+            title = name[:31 - len(suffix)] + suffix
+            n += 1
+        used.add(title.lower())
+        ws = wb.create_sheet(title)
+        ws.append(columns)
+        return ws
+
+    for s in sheets:
+        columns = list(s.columns) if s.columns else snapshot_table(s.path).column_names
+        ws, rows = new_sheet(s.name, columns), 0
+        for batch in iter_batches(s, chunksize):
+            for row in batch.to_pandas().itertuples(index=False, name=None):
+                if rows == EXCEL_MAX_ROWS:
+                    ws, rows = new_sheet(s.name, columns), 0
+                ws.append([_cell(v) for v in row])
+                rows += 1
+    wb.save(out)
+
+WRITERS = {"csv": _write_csv, "parquet": _write_parquet}
+
+def _write(sheets, fmt, out, chunksize):
+    if fmt == "xlsx":
+        return _write_xlsx(sheets, out, chunksize)
+    if not _zipped(sheets, fmt):
+        return WRITERS[fmt](sheets[0], out, chunksize)
+    # One member per sheet, each written to disk and then added to the zip
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf, tempfile.TemporaryDirectory() as tmp:
+        for s in sheets:
+            member = os.path.join(tmp, export_name([s], fmt))
+            WRITERS[fmt](s, member, chunksize)
+            zf.write(member, arcname=export_name([s], fmt))
+            os.remove(member)
+
+# -----------------------
+# CACHE
+# -----------------------
+def _prune(keep):
+    files = [os.path.join(EXPORT_DIR, f) for f in os.listdir(EXPORT_DIR) if not f.endswith(".tmp")]
+    files = sorted((os.stat(f).st_mtime, os.path.getsize(f), f) for f in files if os.path.isfile(f))
+    total = sum(size for _, size, _ in files)
+    for _, size, f in files:
+        if total <= EXPORT_MAX_BYTES:
+            break
+        if f != keep:
+            os.remove(f)
+            total -= size
+
+def export_file(sheets, fmt, chunksize=CHUNKSIZE) -> str:
+    """
+    Path of the export of sheets in fmt, writing it first unless an
+    export with the same key is already on disk. The file is written
+    beside its final name and renamed into place when complete.
+    """
+    sheets = list(sheets)
+    if not sheets:
+        raise ValueError("Nothing to export.")
+    if fmt not in available_formats():
+        raise ValueError(f"Export format {fmt!r} is not available.")
+    key = export_key(sheets, fmt)
+    path = os.path.join(EXPORT_DIR, f"{key}.{'zip' if _zipped(sheets, fmt) else FORMATS[fmt][1]}")
+    with _locks_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+    with lock:
+        hit = os.path.exists(path)
+        record_cache("exports", hit)
+        if hit:
+            os.utime(path)
+            return path
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with timer(f"export:{fmt}"):
+                _write(sheets, fmt, tmp, chunksize)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        _prune(keep=path)
+    return path
+
+def exporter(sheets, fmt, chunksize=CHUNKSIZE):
+    """
+    A zero-argument callable for st.download_button(data=...): nothing
+    is read or encoded until the button is clicked, and a repeat click
+    reads the cached file instead of encoding it again.
+    """
+    sheets = list(sheets)
+
+    def read():
+        with open(export_file(sheets, fmt, chunksize), "rb") as f:
+            return f.read()
+    return read
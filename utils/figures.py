@@ -0,0 +1,84 @@
+# utils/figures.py
+import hashlib
+import json
+import marshal
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from utils.metrics import record_cache, timer
+
+# -----------------------
+# VERSIONS
+# -----------------------
+def frame_version(df: pd.DataFrame) -> str:
+    """
+    Content hash of a frame, for data that has no cheaper version (such
+    as a derived-table key).
+    """
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
+
+# -----------------------
+# CACHE
+# -----------------------
+class FigureCache:
+    """
+    LRU cache of serialized figure JSON, evicting by total size in bytes.
+    """
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            spec = self._items.get(key)
+            if spec is not None:
+                self._items.move_to_end(key)
+            return spec
+
+    def put(self, key, spec: str):
+        if len(spec) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._items:
+                self.size -= len(self._items.pop(key))
+            self._items[key] = spec
+            self.size += len(spec)
+            while self.size > self.max_bytes:
+                _, old = self._items.popitem(last=False)
+                self.size -= len(old)
+
+figure_cache = FigureCache()
+
+def figure_key(name, build, version, params) -> str:
+    parts = [name, hashlib.sha256(marshal.dumps(build.__code__)).hexdigest(), version,
+             json.dumps(params, sort_keys=True, default=str)]
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+def cached_figure(name, build, data, version=None, **params) -> dict:
+    """
+    The figure build(data, **params) returns, as a plotly figure dict
+    that st.plotly_chart accepts.
+
+    The figure's JSON is cached by name, the builder's code, the data
+    version and params, so an unchanged chart costs a lookup and a JSON
+    parse instead of a rebuild. version defaults to frame_version(data);
+    pass a derived-table key when there is one. build must depend only
+    on data and params, and should import plotly itself so a cache hit
+    never needs it.
+    """
+    if version is None:
+        version = frame_version(data)
+    key = figure_key(name, build, version, params)
+    spec = figure_cache.get(key)
+    record_cache("figures", spec is not None)
+    if spec is None:
+        with timer(f"figure:{name}"):
+            spec = build(data, **params).to_json()
+        figure_cache.put(key, spec)
+    return json.loads(spec)
@@ -1,5 +1,13 @@
 # utils/formatting.py
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
 import pandas as pd
+import streamlit as st
+
+from utils.metrics import record_cache, timer
 
 def justify(text: str) -> str:
     """
@@ -11,43 +19,102 @@ def justify(text: str) -> str:
     </div>
     """
 
-def style_table(df: pd.DataFrame) -> str:
+TABLE_CSS = """
+<style>
+table.htm-table {
+    border-collapse: collapse;
+    width: 100%;
+}
+table.htm-table th, table.htm-table td {
+    border: 1px solid #ddd;
+    padding: 8px;
+    text-align: left;
+}
+table.htm-table th {
+    background-color: #DAE9F8;
+    color: black;
+}
+table.htm-table tr:nth-child(even) {background-color: #f2f2f2;}
+table.htm-table tr:hover {background-color: #ddd;}
+</style>
+"""
+
+def table_stylesheet() -> str:
+    """
+    The stylesheet for style_table output. Emit it once per page and
+    render the tables themselves with css=False.
+    """
+    return TABLE_CSS
+
+# -----------------------
+# RENDERING
+# -----------------------
+_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"), ("'", "&#x27;")]
+
+def _escape(s: pd.Series) -> pd.Series:
+    s = s.astype("string").fillna("")
+    for char, entity in _ESCAPES:
+        s = s.str.replace(char, entity, regex=False)
+    return s
+
+def _render(df: pd.DataFrame) -> str:
+    head = "".join(f"<th>{h}</th>" for h in _escape(pd.Series(df.columns.map(str))))
+    if df.empty:
+        return f'<table class="htm-table"><thead><tr>{head}</tr></thead><tbody></tbody></table>'
+    # Build every row with column-wise string concatenation, then one join
+    rows = pd.Series("<tr>", index=df.index, dtype="string")
+    for col in range(df.shape[1]):
+        rows = rows + "<td>" + _escape(df.iloc[:, col]) + "</td>"
+    body = "</tr>".join(rows.tolist()) + "</tr>"
+    return f'<table class="htm-table"><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+CACHE_ENTRIES = 256
+
+def _frame_key(df: pd.DataFrame) -> str:
+    h = hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(repr(list(df.columns)).encode())
+    return h.hexdigest()
+
+def style_table(df: pd.DataFrame, columns=None, css=True, page=None, page_size=50) -> str:
     """
     Convert DataFrame to HTML table with custom styling for Streamlit.
+
+    columns selects and orders the columns (all by default). Cell
+    values are HTML-escaped. With page set, only rows
+    [page*page_size, (page+1)*page_size) are rendered. Output is cached
+    by the content of the rendered slice.
     """
     # Reset index to hide it
     df = df.reset_index(drop=True)
+    if columns is not None:
+        df = df[list(columns)]
+    if page is not None:
+        df = df.iloc[page * page_size:(page + 1) * page_size]
 
-    html = """
-    <style>
-    table {
-        border-collapse: collapse;
-        width: 100%;
-    }
-    th, td {
-        border: 1px solid #ddd;
-        padding: 8px;
-        text-align: left;
-    }
-    th {
-        background-color: #DAE9F8;
-        color: black;
-    }
-    tr:nth-child(even) {background-color: #f2f2f2;}
-    tr:hover {background-color: #ddd;}
-    </style>
-    <table>
-        <thead>
-            <tr>
-                <th>Indicator</th>
-                <th>Value</th>
-            </tr>
-        </thead>
-        <tbody>
-    """
-
-    for _, row in df.iterrows():
-        html += f"<tr><td>{row['Indicator']}</td><td>{row['Value']}</td></tr>"
-
-    html += "</tbody></table>"
-    return html
+    key = _frame_key(df)
+    with _cache_lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+    record_cache("style_table", html is not None)
+    if html is None:
+        with timer("render_table"):
+            html = _render(df)
+        with _cache_lock:
+            _cache[key] = html
+            while len(_cache) > CACHE_ENTRIES:
+                _cache.popitem(last=False)
+    return (TABLE_CSS + html) if css else html
+
+def paginated_table(df: pd.DataFrame, key: str, columns=None, page_size=50):
+    """
+    Render a large table one page at a time, with a page selector.
+    Assumes table_stylesheet() has been emitted on the page.
+    """
+    pages = max(math.ceil(len(df) / page_size), 1)
+    page = 0
+    if pages > 1:
+        page = st.number_input(f"Page (1-{pages})", 1, pages, 1, key=key) - 1
+    st.markdown(style_table(df, columns, css=False, page=page, page_size=page_size), unsafe_allow_html=True)
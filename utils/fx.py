@@ -0,0 +1,74 @@
+# utils/fx.py
+import numpy as np
+import pandas as pd
+
+MAX_GAP_DAYS = 7  # an as-of rate older than this (e.g. past the table's end) is treated as missing
+
+def _days(dates) -> np.ndarray:
+    # Dates as int64 day numbers; NaT becomes the int64 minimum, before any rate
+    return pd.DatetimeIndex(dates).values.astype("datetime64[D]").astype(np.int64)
+
+class RateTable:
+    """
+    Daily exchange rates, quoted as units of local currency per USD.
+
+    Each currency is held as a sorted int32 array of day numbers and a
+    float64 array of rates, so a lookup is one binary search per value
+    and the table for a decade of daily rates is a few tens of KB.
+    Days without a quote (weekends, holidays) take the last rate
+    before them.
+    """
+    def __init__(self, rates: pd.DataFrame):
+        self._tables = {}
+        rates = rates.dropna(subset=["date", "currency", "local_per_usd"])
+        for currency, g in rates.groupby("currency", sort=True):
+            g = g.sort_values("date").drop_duplicates("date", keep="last")
+            self._tables[str(currency)] = (_days(g["date"]).astype(np.int32),
+                                           g["local_per_usd"].to_numpy(dtype=np.float64))
+
+    @property
+    def currencies(self) -> list:
+        return sorted(self._tables)
+
+    def span(self, currency):
+        """
+        First and last date quoted for currency.
+        """
+        days = self._tables[currency][0]
+        return pd.Timestamp(days[0], unit="D"), pd.Timestamp(days[-1], unit="D")
+
+    def rate(self, currencies, dates, max_gap_days=MAX_GAP_DAYS) -> np.ndarray:
+        """
+        The as-of rate for each (currency, date) pair: the latest quote
+        on or before the date, NaN if there is none within max_gap_days
+        or the currency is unknown. USD is always 1.
+        """
+        codes, uniques = pd.factorize(pd.Series(currencies).astype(object), use_na_sentinel=True)
+        days = _days(dates)
+        out = np.full(len(days), np.nan)
+        for i, currency in enumerate(uniques):
+            mask = codes == i
+            if currency == "USD":
+                out[mask] = 1.0
+                continue
+            if currency not in self._tables:
+                continue
+            quoted, rates = self._tables[currency]
+            d = days[mask]
+            pos = np.searchsorted(quoted, d, side="right") - 1
+            ok = (pos >= 0) & (d - quoted[np.maximum(pos, 0)] <= max_gap_days)
+            out[mask] = np.where(ok, rates[np.maximum(pos, 0)], np.nan)
+        return out
+
+    def to_usd(self, amounts, currencies, dates, max_gap_days=MAX_GAP_DAYS) -> np.ndarray:
+        """
+        Convert local-currency amounts to USD at the as-of rate of each
+        date. Amounts without a rate become NaN.
+        """
+        return np.asarray(amounts, dtype=np.float64) / self.rate(currencies, dates, max_gap_days)
+
+def load_rates(path) -> RateTable:
+    """
+    A RateTable from a CSV with date, currency and local_per_usd columns.
+    """
+    return RateTable(pd.read_csv(path, parse_dates=["date"]))
@@ -0,0 +1,208 @@
+# utils/ingest.py
+import numpy as np
+import pandas as pd
+
+from utils.fx import load_rates
+from utils.metrics import timed
+from utils.partitions import read_partitioned, scan_partitioned, partition_keys
+
+REGIONAL_FILES = {
+    "countries": "data/regional/countries.csv",
+    "products": "data/regional/products.csv",
+    "benchmarks": "data/regional/benchmarks.csv",
+    "budgets": "data/regional/budgets.csv",
+    "procurements": "data/regional/procurements.csv",
+    "fx_rates": "data/regional/fx_rates.csv",
+}
+
+PO_DATES = ["po_date", "delivery_date", "payment_date"]
+KPI_METRICS = ["lead_time_days", "payment_delay_days", "fulfillment_rate", "price_variance_pct"]
+CHUNKSIZE = 100_000
+FX_DATE = "po_date"  # prices are converted at the rate of this date
+
+# -----------------------
+# DIMENSIONS
+# -----------------------
+def load_dimensions(files=REGIONAL_FILES):
+    """
+    Load the small dimension tables, indexed by their id for lookups,
+    and the FX rate table. Returns (countries, products, benchmarks,
+    budgets, rates).
+    """
+    countries = pd.read_csv(files["countries"]).set_index("country_id", drop=False)
+    products = pd.read_csv(files["products"]).set_index("product_id", drop=False)
+    benchmarks = pd.read_csv(files["benchmarks"]).set_index("product_id", drop=False)
+    budgets = read_partitioned(files["budgets"])
+    budgets["budget_execution_rate"] = budgets["disbursed_htm_usd"] / budgets["allocated_htm_usd"]
+    return countries, products, benchmarks, budgets, load_rates(files["fx_rates"])
+
+def _lookup(dim: pd.DataFrame, keys: pd.Series, columns) -> pd.DataFrame:
+    # Positional take through the dimension's index instead of a merge
+    pos = dim.index.get_indexer(keys)
+    out = dim[columns].iloc[np.where(pos < 0, 0, pos)].reset_index(drop=True)
+    out.index = keys.index
+    return out[pos >= 0]
+
+# -----------------------
+# PO STREAM
+# -----------------------
+def iter_procurements(path=REGIONAL_FILES["procurements"], chunksize=CHUNKSIZE, **filters):
+    """
+    Yield purchase orders from a PO-level CSV in chunks of up to
+    chunksize rows. The POs are read from the file's country/year
+    partitioned copy (see utils/partitions.py), so filters (countries,
+    years, start, end, on) only read the partitions and row groups
+    they need.
+    """
+    yield from scan_partitioned(path, PO_DATES, "po_date", chunksize=chunksize, **filters)
+
+def po_years(path=REGIONAL_FILES["procurements"]) -> pd.DataFrame:
+    """
+    The (country_id, year) pairs with POs, without reading any.
+    """
+    return partition_keys(path, PO_DATES, "po_date")
+
+def enrich(chunk: pd.DataFrame, countries, products, benchmarks, rates, fx_date=FX_DATE) -> pd.DataFrame:
+    """
+    Join the dimensions onto a PO chunk and add the derived KPI columns.
+    POs whose country or product is unknown are dropped, as an inner
+    merge would. Unit prices are converted to USD at the rate of
+    fx_date before being compared with the USD benchmark; POs without
+    a rate get a NaN price variance.
+    """
+    c = _lookup(countries, chunk["country_id"], ["name", "iso3", "lat", "lon", "region", "income_level"])
+    p = _lookup(products, chunk["product_id"], ["disease", "product_name"])
+    b = _lookup(benchmarks, chunk["product_id"], ["wambo_price_usd", "gdf_price_usd"])
+    keep = c.index.intersection(p.index).intersection(b.index)
+    df = pd.concat([chunk.loc[keep], c.loc[keep], p.loc[keep], b.loc[keep]], axis=1)
+
+    df["lead_time_days"] = (df["delivery_date"] - df["po_date"]).dt.days
+    df["payment_delay_days"] = (df["payment_date"] - df["delivery_date"]).dt.days
+    df["fulfillment_rate"] = df["quantity_delivered"] / df["quantity_ordered"]
+    df["unit_price_usd"] = rates.to_usd(df["unit_price_local"], df["currency"], df[fx_date])
+    df["price_variance_pct"] = (df["unit_price_usd"] / df["wambo_price_usd"] - 1) * 100
+    return df
+
+def iter_enriched(dims=None, path=REGIONAL_FILES["procurements"], chunksize=CHUNKSIZE, **filters):
+    countries, products, benchmarks, _, rates = dims or load_dimensions()
+    for chunk in iter_procurements(path, chunksize, **filters):
+        yield enrich(chunk, countries, products, benchmarks, rates)
+
+def country_transactions(country_id, dims=None, path=REGIONAL_FILES["procurements"], chunksize=CHUNKSIZE, years=None):
+    """
+    Enriched POs of a single country (and optionally some PO years),
+    read from that country's partitions only.
+    """
+    parts = list(iter_enriched(dims, path, chunksize, countries=[country_id], years=years))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+# -----------------------
+# RUNNING AGGREGATES
+# -----------------------
+class KpiAccumulator:
+    """
+    Running per-group count, sum and sum of squares of KPI_METRICS
+    (plus cross-product sums for pairs), so means, standard deviations
+    and correlations never need the full PO table.
+    """
+    def __init__(self, metrics=KPI_METRICS, pairs=()):
+        self.metrics = list(metrics)
+        self.pairs = list(pairs)
+        self.count = None
+        self.sum = None
+        self.sumsq = None
+        self.sumxy = None
+
+    def update(self, df: pd.DataFrame, by="country_id"):
+        keys = [df[b] for b in by] if isinstance(by, list) else df[by]
+        g = df.groupby(keys)[self.metrics]
+        cross = pd.DataFrame({f"{a}*{b}": df[a] * df[b] for a, b in self.pairs}, index=df.index)
+        parts = (g.count(), g.sum(), (df[self.metrics] ** 2).groupby(keys).sum(), cross.groupby(keys).sum())
+        if self.count is None:
+            self.count, self.sum, self.sumsq, self.sumxy = parts
+        else:
+            self.count = self.count.add(parts[0], fill_value=0)
+            self.sum = self.sum.add(parts[1], fill_value=0)
+            self.sumsq = self.sumsq.add(parts[2], fill_value=0)
+            self.sumxy = self.sumxy.add(parts[3], fill_value=0)
+        return self
+
+    def rollup(self, level):
+        """
+        A new accumulator grouped by one level of a multi-key grouping,
+        e.g. per country from a (country_id, product_id) accumulator.
+        level=None pools every group into a single "all" row.
+        """
+        def fold(t):
+            return t.groupby(level=level).sum() if level is not None else t.sum().to_frame("all").T
+        acc = KpiAccumulator(self.metrics, self.pairs)
+        acc.count, acc.sum, acc.sumsq, acc.sumxy = (fold(t) for t in (self.count, self.sum, self.sumsq, self.sumxy))
+        return acc
+
+    def mean(self) -> pd.DataFrame:
+        return self.sum / self.count
+
+    def std(self, ddof=1) -> pd.DataFrame:
+        var = (self.sumsq - self.sum ** 2 / self.count) / (self.count - ddof)
+        return np.sqrt(var.clip(lower=0))
+
+    def corr(self, a, b) -> pd.Series:
+        """
+        Pearson correlation of a pair of metrics per group. Rows missing
+        one of the two metrics are assumed rare enough to ignore.
+        """
+        n = self.count[[a, b]].min(axis=1)
+        cov = (self.sumxy[f"{a}*{b}"] - self.sum[a] * self.sum[b] / n) / (n - 1)
+        sd = self.std()
+        return (cov / (sd[a] * sd[b])).clip(-1, 1)
+
+    def pooled(self, ddof=1) -> pd.DataFrame:
+        """
+        Mean and std of each metric over all groups together.
+        """
+        n, s, ss = self.count.sum(), self.sum.sum(), self.sumsq.sum()
+        var = (ss - s ** 2 / n) / (n - ddof)
+        return pd.DataFrame({"mean": s / n, "std": np.sqrt(var.clip(lower=0)), "count": n})
+
+@timed("kpi_stream")
+def compute_kpis(dims=None, path=REGIONAL_FILES["procurements"], chunksize=CHUNKSIZE):
+    """
+    Stream the PO file once and return (kpis, accumulator): the
+    per-country KPI means joined with country attributes and budget
+    execution, plus the accumulator for further statistics.
+    """
+    dims = dims or load_dimensions()
+    countries, _, _, budgets, _ = dims
+    acc = KpiAccumulator()
+    for df in iter_enriched(dims, path, chunksize):
+        acc.update(df)
+    if acc.count is None:
+        return pd.DataFrame(columns=["country_id", "name", "iso3", "lat", "lon", *KPI_METRICS]), acc
+
+    kpis = countries.loc[acc.count.index, ["country_id", "name", "iso3", "lat", "lon"]].reset_index(drop=True)
+    kpis = kpis.join(acc.mean().reset_index(drop=True))
+    # One execution rate per country, over all budget years
+    execution = budgets.groupby("country_id")[["disbursed_htm_usd", "allocated_htm_usd"]].sum()
+    execution = (execution["disbursed_htm_usd"] / execution["allocated_htm_usd"]).rename("budget_execution_rate")
+    kpis = kpis.merge(execution.reset_index(), on="country_id")
+    return kpis, acc
+
+def period_kpis(transactions: pd.DataFrame, budgets: pd.DataFrame, country_id, years) -> pd.Series:
+    """
+    KPI means of one country's enriched POs (e.g. from
+    country_transactions) with its budget execution over the same years.
+    """
+    b = budgets[(budgets["country_id"] == country_id) & budgets["year"].isin(years)]
+    execution = b["disbursed_htm_usd"].sum() / b["allocated_htm_usd"].sum() if not b.empty else np.nan
+    means = transactions.reindex(columns=KPI_METRICS).mean()
+    return pd.concat([means, pd.Series({"budget_execution_rate": execution})])
+
+def compute_distributions(dims=None, path=REGIONAL_FILES["procurements"], chunksize=CHUNKSIZE):
+    """
+    Stream the PO file into an accumulator grouped by (country_id,
+    product_id), tracking the lead time / fulfillment cross product.
+    """
+    acc = KpiAccumulator(pairs=[("lead_time_days", "fulfillment_rate")])
+    for df in iter_enriched(dims, path, chunksize):
+        acc.update(df, by=["country_id", "product_id"])
+    return acc
@@ -1,44 +1,104 @@
 import pandas as pd
-import io
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from utils.datasets import DATA_FILES
+from utils.snapshot import load_snapshot
+from utils.uploads import read_upload, UploadResult
+from utils.metrics import timed
 
-DATA_FILES = {
-    "procurement": "data/procurement.csv",
-    "pfm": "data/pfm.csv",
-    "qa": "data/qa.csv",
-    "cofinancing": "data/cofinancing.csv",
-    "ctexts": "data/ctexts.csv",
-    "cpfm": "data/cpfm.csv",
-    "wca_summary": "data/wca_summary.csv"
-}
-
-@st.cache_data
+# Shallow copies share column buffers and only copy a column when it is written
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def _shared_frame(path, mtime_ns):
+    # One frame per source version, shared by every session without pickling
+    return load_snapshot(path)
+
+@timed("load")
 def load_csv(path):
-    # Try 'utf-8' first, then fall back to 'latin-1' if needed
-    try:
-        return pd.read_csv(path, encoding='utf-8')
-    except UnicodeDecodeError:
-        return pd.read_csv(path, encoding='latin-1')
-    
-def load_all():
-    data = {}
-    for k, p in DATA_FILES.items():
-        try:
-            data[k] = load_csv(p)
-        except Exception:
-            data[k] = pd.DataFrame()
-    return data
-
-def read_uploaded(file) -> pd.DataFrame:
-    # Accepts in-memory uploaded file
-    if file is None:
-        return None
-    content = file.read()
+    """
+    Return a dataset from the shared registry. The frame is a shallow
+    copy, so reading it copies nothing; use derive() to add columns.
+    """
+    return _shared_frame(path, os.stat(path).st_mtime_ns).copy(deep=False)
+
+def derive(df: pd.DataFrame, columns: dict) -> pd.DataFrame:
+    """
+    Return df with derived or replaced columns. Untouched columns keep
+    sharing memory with the registry frame.
+    """
+    return df.assign(**columns)
+
+def _load_or_empty(key):
     try:
-        return pd.read_csv(io.BytesIO(content))
+        return load_csv(DATA_FILES[key])
     except Exception:
-        # try Excel
-        try:
-            return pd.read_excel(io.BytesIO(content))
-        except Exception:
-            return None
+        return pd.DataFrame()
+
+class LazyData(Mapping):
+    """
+    Read-only mapping over DATA_FILES that loads a dataset the first
+    time it is accessed, e.g. data['qa'] loads only qa.csv.
+    """
+    def __init__(self):
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key):
+        if key not in DATA_FILES:
+            raise KeyError(key)
+        with self._lock:
+            if key not in self._frames:
+                self._frames[key] = _load_or_empty(key)
+            return self._frames[key]
+
+    def __iter__(self):
+        return iter(DATA_FILES)
+
+    def __len__(self):
+        return len(DATA_FILES)
+
+    def prefetch(self, keys):
+        """
+        Load several datasets together on a thread pool.
+        """
+        missing = [k for k in keys if k not in self._frames]
+        if len(missing) <= 1:
+            for k in missing:
+                self[k]
+            return self
+        ctx = get_script_run_ctx()
+
+        def fetch(key):
+            # Attach the page's script context so st.cache_resource works in the worker
+            if ctx is not None:
+                add_script_run_ctx(threading.current_thread(), ctx)
+            return key, _load_or_empty(key)
+
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            for key, df in pool.map(fetch, missing):
+                with self._lock:
+                    self._frames.setdefault(key, df)
+        return self
+
+def load_datasets(*keys):
+    """
+    Declare the datasets a page needs; they are prefetched in parallel
+    and any other dataset is still loaded lazily on first access.
+    """
+    unknown = [k for k in keys if k not in DATA_FILES]
+    if unknown:
+        raise KeyError(f"Unknown dataset(s): {', '.join(unknown)}")
+    return LazyData().prefetch(keys)
+
+def load_all():
+    return load_datasets(*DATA_FILES)
+
+def read_uploaded(file, dataset=None) -> UploadResult:
+    # Streaming, size-limited reader; see utils/uploads.py for the limits
+    return read_upload(file, dataset)
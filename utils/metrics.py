@@ -0,0 +1,198 @@
+# utils/metrics.py
+import atexit
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_FILE = os.environ.get("HTM_METRICS_FILE")  # e.g. metrics/metrics.prom; nothing is written when unset
+METRICS_PORT = os.environ.get("HTM_METRICS_PORT")  # serve /metrics when set
+METRICS_HOST = os.environ.get("HTM_METRICS_HOST", "127.0.0.1")
+FLUSH_SECONDS = 10
+
+# Latency bucket upper bounds in seconds (Prometheus style, cumulative)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_page = contextvars.ContextVar("htm_page", default="none")
+_lock = threading.Lock()
+_latency = {}   # (page, stage) -> [bucket counts..., +Inf count, sum]
+_cache = {}     # cache -> [hits, misses]
+_last_flush = 0.0
+
+# -----------------------
+# RECORDING
+# -----------------------
+def observe(stage, seconds, page=None):
+    key = (page or _page.get(), stage)
+    with _lock:
+        h = _latency.get(key)
+        if h is None:
+            h = _latency[key] = [0] * (len(BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h[i] += 1
+        h[len(BUCKETS)] += 1
+        h[-1] += seconds
+
+def record_cache(cache, hit):
+    with _lock:
+        c = _cache.setdefault(cache, [0, 0])
+        c[0 if hit else 1] += 1
+
+@contextmanager
+def timer(stage, page=None):
+    """
+    Time a block: with timer("figures"): ...
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(stage, time.perf_counter() - start, page)
+
+def timed(stage):
+    """
+    Decorator recording the latency of every call under stage.
+    """
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            with timer(stage):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+# -----------------------
+# PAGE RUNS
+# -----------------------
+class PageRun:
+    """
+    One page rerun. Start it at the top of a page and finish() it at the
+    bottom; the whole rerun is recorded as stage "rerun" and stages
+    timed in between are labelled with the page.
+    """
+    def __init__(self, page, profile=False):
+        self.page = page
+        self.token = _page.set(page)
+        self.profiler = None
+        if profile:
+            self.profiler = _start_profiler()
+        self.start = time.perf_counter()
+
+    def finish(self):
+        observe("rerun", time.perf_counter() - self.start, self.page)
+        _page.reset(self.token)
+        report = _stop_profiler(self.profiler) if self.profiler else None
+        flush()
+        return report
+
+def page_run(page, profile=False) -> PageRun:
+    _ensure_server()
+    return PageRun(page, profile)
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+        profiler = Profiler()
+    except ImportError:
+        profiler = cProfile.Profile()
+    profiler.enable() if isinstance(profiler, cProfile.Profile) else profiler.start()
+    return profiler
+
+def _stop_profiler(profiler) -> str:
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(30)
+        return out.getvalue()
+    profiler.stop()
+    return profiler.output_text(unicode=True, color=False)
+
+# -----------------------
+# EXPORT
+# -----------------------
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+def prometheus_text() -> str:
+    """
+    All metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        latency = {k: list(v) for k, v in _latency.items()}
+        cache = {k: list(v) for k, v in _cache.items()}
+    lines = ["# HELP htm_stage_seconds Latency of dashboard stages.", "# TYPE htm_stage_seconds histogram"]
+    for (page, stage), h in sorted(latency.items()):
+        labels = f'page="{_label(page)}",stage="{_label(stage)}"'
+        for bound, count in zip(BUCKETS, h):
+            lines.append(f'htm_stage_seconds_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'htm_stage_seconds_bucket{{{labels},le="+Inf"}} {h[len(BUCKETS)]}')
+        lines.append(f"htm_stage_seconds_sum{{{labels}}} {h[-1]:.6f}")
+        lines.append(f"htm_stage_seconds_count{{{labels}}} {h[len(BUCKETS)]}")
+    lines += ["# HELP htm_cache_requests_total Cache lookups by result.", "# TYPE htm_cache_requests_total counter"]
+    for name, (hits, misses) in sorted(cache.items()):
+        lines.append(f'htm_cache_requests_total{{cache="{_label(name)}",result="hit"}} {hits}')
+        lines.append(f'htm_cache_requests_total{{cache="{_label(name)}",result="miss"}} {misses}')
+    return "\n".join(lines) + "\n"
+
+def flush(force=False):
+    """
+    Write the metrics file, at most every FLUSH_SECONDS unless forced.
+    """
+    global _last_flush
+    now = time.monotonic()
+    if not METRICS_FILE or (not force and now - _last_flush < FLUSH_SECONDS):
+        return
+    _last_flush = now
+    try:
+        os.makedirs(os.path.dirname(METRICS_FILE) or ".", exist_ok=True)
+        tmp = f"{METRICS_FILE}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, METRICS_FILE)
+    except OSError:
+        pass
+
+if METRICS_FILE:
+    atexit.register(flush, True)
+
+def _serve(port):
+    # Only imported when HTM_METRICS_PORT is set
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((METRICS_HOST, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+_server = None
+
+def _ensure_server():
+    global _server
+    if not METRICS_PORT or _server is not None:
+        return
+    with _lock:
+        if _server is None:
+            try:
+                _server = _serve(int(METRICS_PORT))
+            except OSError:
+                _server = False  # port taken, e.g. by another worker
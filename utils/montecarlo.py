@@ -0,0 +1,169 @@
+# utils/montecarlo.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import timer
+
+LEAD, FULFILL = "lead_time_days", "fulfillment_rate"
+
+BLOCK = 1_000_000        # draws per independent RNG stream
+CHUNK = 250_000          # draws held in memory at once
+PARALLEL_MIN = 2_000_000  # below this a process pool costs more than it saves
+
+# -----------------------
+# DISTRIBUTIONS
+# -----------------------
+def distribution_params(acc, country_id=None, min_count=2) -> pd.DataFrame:
+    """
+    Per (country, product) bivariate normal parameters for lead time and
+    fulfillment, from a compute_distributions() accumulator.
+
+    Groups with fewer than min_count POs borrow the country's spread and
+    correlation, and failing that the pooled regional one. The weight of
+    a group is its share of POs.
+    """
+    mean, sd, n = acc.mean(), acc.std(), acc.count[LEAD]
+    rho = acc.corr(LEAD, FULFILL)
+    country, pooled = acc.rollup(0), acc.rollup(None)
+    c_sd, c_rho, c_n = country.std(), country.corr(LEAD, FULFILL), country.count[LEAD]
+    p_sd, p_rho = pooled.std().iloc[0], pooled.corr(LEAD, FULFILL).iloc[0]
+
+    cid = mean.index.get_level_values(0)
+    few = (n < min_count).to_numpy()
+    c_few = (c_n.reindex(cid) < min_count).to_numpy()
+
+    def spread(own, by_country, overall):
+        v = np.where(few, by_country.reindex(cid).to_numpy(), own.to_numpy())
+        v = np.where(few & c_few, overall, v)
+        return np.where(np.isnan(v), overall if not np.isnan(overall) else 0.0, v)
+
+    params = pd.DataFrame({
+        "lead_mu": mean[LEAD].to_numpy(),
+        "lead_sd": spread(sd[LEAD], c_sd[LEAD], p_sd[LEAD]),
+        "ful_mu": mean[FULFILL].to_numpy(),
+        "ful_sd": spread(sd[FULFILL], c_sd[FULFILL], p_sd[FULFILL]),
+        "rho": np.clip(spread(rho, c_rho, p_rho), -0.99, 0.99),
+        "weight": n.to_numpy(dtype=float),
+    }, index=mean.index)
+    if country_id is not None:
+        params = params[cid == country_id]
+    return params
+
+# -----------------------
+# SAMPLING
+# -----------------------
+@dataclass(frozen=True)
+class SimResult:
+    n: int
+    p_delay: float
+    p_stockout: float
+    lead_edges: np.ndarray
+    lead_counts: np.ndarray
+    ful_edges: np.ndarray
+    ful_counts: np.ndarray
+
+    def ci(self, p, z=1.96):
+        """
+        Half-width of the normal-approximation confidence interval.
+        """
+        return z * np.sqrt(p * (1 - p) / self.n)
+
+def _edges(mu, sd, bins):
+    lo, hi = np.min(mu - 5 * sd), np.max(mu + 5 * sd)
+    if hi <= lo:
+        lo, hi = lo - 1, hi + 1
+    return np.linspace(lo, hi, bins + 1)
+
+def _bin(x, edges):
+    # Fixed-width bins; values beyond the edges fold into the end bins
+    bins = len(edges) - 1
+    i = ((x - edges[0]) * (bins / (edges[-1] - edges[0]))).astype(np.int64)
+    return np.bincount(np.clip(i, 0, bins - 1), minlength=bins)
+
+def _sample_block(arrays, n, seed, lead_edges, ful_edges, lead_threshold, ful_threshold, chunk=CHUNK):
+    """
+    Draw n samples from one RNG stream, keeping only histogram counts
+    and exceedance counters.
+    """
+    lead_mu, lead_sd, ful_mu, ful_sd, rho, prob = arrays
+    rng = np.random.default_rng(seed)
+    lead_counts = np.zeros(len(lead_edges) - 1, dtype=np.int64)
+    ful_counts = np.zeros(len(ful_edges) - 1, dtype=np.int64)
+    delays = stockouts = 0
+    left = n
+    while left > 0:
+        m = min(chunk, left)
+        g = np.repeat(np.arange(len(prob)), rng.multinomial(m, prob))
+        z1, z2 = rng.standard_normal((2, m))
+        lead = lead_mu[g] + lead_sd[g] * z1
+        ful = ful_mu[g] + ful_sd[g] * (rho[g] * z1 + np.sqrt(1 - rho[g] ** 2) * z2)
+        lead_counts += _bin(lead, lead_edges)
+        ful_counts += _bin(ful, ful_edges)
+        delays += int(np.count_nonzero(lead > lead_threshold))
+        stockouts += int(np.count_nonzero(ful < ful_threshold))
+        left -= m
+    return lead_counts, ful_counts, delays, stockouts
+
+_pool = None
+_pool_workers = None
+_pool_lock = threading.Lock()
+
+def _executor(workers):
+    # One process pool for the life of the process, so a large run pays
+    # for starting workers once rather than on every call
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        return _pool
+
+def _discard(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+def simulate(params: pd.DataFrame, n, seed=42, lead_threshold=90, ful_threshold=0.95, bins=40, workers=None) -> SimResult:
+    """
+    Simulate n draws from the mixture of group distributions in params.
+
+    The draws are split into fixed blocks, each with its own stream
+    spawned from seed, so results depend only on (params, n, seed) and
+    not on the number of workers. Large runs are spread over a shared
+    process pool. Results are not cached here; the pages get them
+    through derived.risk_simulation.
+    """
+    arrays = tuple(params[c].to_numpy(dtype=float) for c in ["lead_mu", "lead_sd", "ful_mu", "ful_sd", "rho"])
+    prob = params["weight"].to_numpy(dtype=float)
+    arrays += (prob / prob.sum(),)
+
+    lead_edges = _edges(arrays[0], arrays[1], bins)
+    ful_edges = _edges(arrays[2], arrays[3], bins)
+    sizes = [BLOCK] * (n // BLOCK) + ([n % BLOCK] if n % BLOCK else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(arrays, m, s, lead_edges, ful_edges, lead_threshold, ful_threshold) for m, s in zip(sizes, seeds)]
+
+    workers = workers or os.cpu_count() or 1
+    with timer("monte_carlo"):
+        if n >= PARALLEL_MIN and workers > 1:
+            pool = _executor(workers)
+            try:
+                parts = list(pool.map(_sample_block, *zip(*jobs)))
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool on the next run
+                _discard(pool)
+                raise
+        else:
+            parts = [_sample_block(*job) for job in jobs]
+
+    lead_counts, ful_counts, delays, stockouts = (sum(p[i] for p in parts) for i in range(4))
+    return SimResult(n, delays / n, stockouts / n, lead_edges, lead_counts, ful_edges, ful_counts)
@@ -0,0 +1,261 @@
+# utils/partitions.py
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from utils.metrics import record_cache, timer
+
+PARTITION_DIR = os.environ.get("HTM_PARTITION_DIR", "data/.partitions")
+PARTITION_VERSION = 1
+PARTITION_KEYS = pa.schema([("country_id", pa.int64()), ("year", pa.int64())])
+ROW_GROUP = 32_768   # rows per Parquet row group, the unit of date-range pruning
+CHUNKSIZE = 100_000
+
+_locks = {}
+_locks_lock = threading.Lock()
+
+# -----------------------
+# LAYOUT
+# -----------------------
+def partition_root(path):
+    """
+    Directory of the partitioned copy of a source CSV:
+    PARTITION_DIR/<name>/country_id=<id>/year=<yyyy>/*.parquet
+    """
+    return os.path.join(PARTITION_DIR, os.path.splitext(os.path.basename(path))[0])
+
+def _meta_path(root):
+    return os.path.join(root, "_meta.json")
+
+def _read_meta(root):
+    try:
+        with open(_meta_path(root), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def _hash_file(path) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+# -----------------------
+# BUILD
+# -----------------------
+class _Widened(Exception):
+    # A chunk did not fit the schema so far; carries the widened schema
+    def __init__(self, schema):
+        self.schema = schema
+
+def _widen_type(a, b):
+    # One Arrow type for a column whose chunks parsed differently:
+    # float64 for a mix of numbers, otherwise text
+    if a == b or pa.types.is_null(b):
+        return a
+    if pa.types.is_null(a):
+        return b
+    numeric = (pa.types.is_integer, pa.types.is_floating)
+    if any(f(a) for f in numeric) and any(f(b) for f in numeric):
+        return pa.float64()
+    return pa.string()
+
+def _widen(schema, other):
+    fields = {f.name: f.type for f in other}
+    return pa.schema([(f.name, _widen_type(f.type, fields.get(f.name, f.type))) for f in schema])
+
+def _batches(path, dates, year_from, chunksize, schema=None):
+    # CSV chunks with the year partition column added, cast to schema
+    # (by default the first chunk's). A chunk that does not fit, e.g.
+    # decimals in a column that was whole numbers so far, raises
+    # _Widened so the caller can start over with the wider schema.
+    for chunk in pd.read_csv(path, parse_dates=list(dates), chunksize=chunksize):
+        if year_from != "year":
+            chunk = chunk.assign(year=chunk[year_from].dt.year)
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        schema = schema or table.schema
+        wider = _widen(schema, table.schema)
+        if not wider.equals(schema):
+            raise _Widened(wider)
+        yield from table.cast(schema).to_batches()
+
+def _write(path, dates, year_from, chunksize, out):
+    # Write the partitioned dataset to out, once more from the start
+    # for each time a later chunk widens the schema
+    schema = None
+    while True:
+        shutil.rmtree(out, ignore_errors=True)
+        batches = _batches(path, dates, year_from, chunksize, schema)
+        try:
+            first = next(batches, None)
+            if first is None:
+                os.makedirs(out)
+                return
+            def all_batches():
+                yield first
+                yield from batches
+            ds.write_dataset(pa.RecordBatchReader.from_batches(first.schema, all_batches()), out,
+                             format="parquet", partitioning=ds.partitioning(PARTITION_KEYS, flavor="hive"),
+                             min_rows_per_group=ROW_GROUP, max_rows_per_group=ROW_GROUP)
+            return
+        except _Widened as e:
+            schema = e.schema
+
+def _sort_fragments(root, sort_by):
+    # Each country-year is small enough to sort in memory. Sorted row
+    # groups have narrow min/max statistics, which is what lets a date
+    # range skip them.
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            if name.endswith(".parquet"):
+                file = os.path.join(dirpath, name)
+                table = pq.read_table(file).sort_by(sort_by)
+                pq.write_table(table, file, row_group_size=ROW_GROUP)
+
+def build_partitions(path, dates=(), year_from="year", chunksize=CHUNKSIZE) -> str:
+    """
+    Stream a source CSV into a Parquet dataset partitioned by country_id
+    and year, where year is the year_from column (or its year, for a
+    date column). Rows are sorted by the first of dates within each
+    partition. The dataset is written beside its final place and then
+    swapped in, so readers never see a half-built one. Returns its root.
+    """
+    root = partition_root(path)
+    tmp = f"{root}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    columns = list(pd.read_csv(path, nrows=0).columns)
+    meta = {"version": PARTITION_VERSION, "sha256": _hash_file(path), "columns": columns,
+            "dates": list(dates), "year_from": year_from, **_source_stat(path)}
+    with timer(f"partition:{os.path.basename(root)}"):
+        _write(path, dates, year_from, chunksize, tmp)
+        if dates:
+            _sort_fragments(tmp, dates[0])
+        with open(_meta_path(tmp), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    old = f"{root}.{os.getpid()}.old"
+    if os.path.exists(root):
+        os.replace(root, old)
+    os.replace(tmp, root)
+    shutil.rmtree(old, ignore_errors=True)
+    return root
+
+def ensure_partitions(path, dates=(), year_from="year") -> dict:
+    """
+    The metadata of the partitioned copy of path, building or rebuilding
+    it first if the source changed (same rules as load_snapshot: a
+    matching mtime and size is trusted, otherwise the content hash
+    decides).
+    """
+    root = partition_root(path)
+    with _locks_lock:
+        lock = _locks.setdefault(root, threading.Lock())
+    with lock:
+        meta = _read_meta(root)
+        stat = _source_stat(path)
+        fresh = meta is not None and meta.get("version") == PARTITION_VERSION \
+            and meta.get("dates") == list(dates) and meta.get("year_from") == year_from
+        if fresh and (meta.get("mtime_ns"), meta.get("size")) != (stat["mtime_ns"], stat["size"]):
+            fresh = meta.get("sha256") == _hash_file(path)
+            if fresh:
+                meta = {**meta, **stat}
+                with open(_meta_path(root), "w", encoding="utf-8") as f:
+                    json.dump(meta, f)
+        record_cache("partitions", fresh)
+        if not fresh:
+            build_partitions(path, dates, year_from)
+            meta = _read_meta(root)
+    return meta
+
+# -----------------------
+# QUERIES
+# -----------------------
+def _filter(meta, countries, years, start, end, on):
+    """
+    Partition filters on country_id and year, plus a date range on the
+    column on (default: the first date column), which prunes row groups
+    by their statistics. A range on the year column also prunes years.
+    """
+    parts = []
+    if countries is not None:
+        parts.append(ds.field("country_id").isin([int(c) for c in countries]))
+    if years is not None:
+        parts.append(ds.field("year").isin([int(y) for y in years]))
+    on = on or (meta["dates"][0] if meta["dates"] else None)
+    for bound, op in ((start, "ge"), (end, "le")):
+        if bound is None:
+            continue
+        if on is None:
+            raise ValueError("A date range needs a date column to filter on.")
+        ts = pd.Timestamp(bound)
+        parts.append(ds.field(on) >= ts.to_pydatetime() if op == "ge" else ds.field(on) <= ts.to_pydatetime())
+        if on == meta["year_from"]:
+            parts.append(ds.field("year") >= ts.year if op == "ge" else ds.field("year") <= ts.year)
+    expr = None
+    for p in parts:
+        expr = p if expr is None else expr & p
+    return expr
+
+def _dataset(path, dates, year_from):
+    meta = ensure_partitions(path, dates, year_from)
+    root = partition_root(path)
+    dataset = ds.dataset(root, format="parquet", partitioning=ds.partitioning(PARTITION_KEYS, flavor="hive"),
+                         exclude_invalid_files=False, ignore_prefixes=["_", "."])
+    return meta, dataset
+
+def scan_partitioned(path, dates=(), year_from="year", countries=None, years=None, start=None, end=None,
+                     on=None, columns=None, chunksize=CHUNKSIZE):
+    """
+    Yield the rows of a partitioned CSV that match the filters, as
+    DataFrames of up to chunksize rows with the source's columns (or
+    columns). Only matching partitions and row groups are read.
+    """
+    meta, dataset = _dataset(path, dates, year_from)
+    columns = list(columns or meta["columns"])
+    if not dataset.files:
+        yield pd.DataFrame(columns=columns)
+        return
+    scanner = dataset.scanner(columns=columns, filter=_filter(meta, countries, years, start, end, on),
+                              batch_size=chunksize)
+    # Partitions are small, so batches are too: coalesce them into chunks
+    pending, rows = [], 0
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            pending.append(batch)
+            rows += batch.num_rows
+        if rows >= chunksize:
+            yield pa.Table.from_batches(pending).to_pandas()
+            pending, rows = [], 0
+    if pending:
+        yield pa.Table.from_batches(pending).to_pandas()
+
+def read_partitioned(path, dates=(), year_from="year", **filters) -> pd.DataFrame:
+    """
+    All rows of a partitioned CSV that match the filters (see
+    scan_partitioned) as one DataFrame.
+    """
+    parts = list(scan_partitioned(path, dates, year_from, **filters))
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+def partition_keys(path, dates=(), year_from="year") -> pd.DataFrame:
+    """
+    The (country_id, year) partitions that exist, from the directory
+    layout alone.
+    """
+    _, dataset = _dataset(path, dates, year_from)
+    keys = [ds.get_partition_keys(f.partition_expression) for f in dataset.get_fragments()]
+    return pd.DataFrame(keys, columns=["country_id", "year"]).drop_duplicates() \
+        .sort_values(["country_id", "year"], ignore_index=True)
@@ -0,0 +1,143 @@
+# utils/pdf_writer.py
+import functools
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen import canvas
+
+# -----------------------
+# TEXT MEASUREMENT
+# -----------------------
+@functools.lru_cache(maxsize=None)
+def glyph_widths(font: str) -> dict:
+    """
+    Per-character advance widths (1/1000 em) for a standard font,
+    built once from its WinAnsi width table.
+    """
+    widths = pdfmetrics.getFont(font).widths
+    table = {}
+    for code in range(256):
+        try:
+            table[bytes([code]).decode("cp1252")] = widths[code]
+        except UnicodeDecodeError:
+            continue
+    return table
+
+def text_width(text: str, font: str, size: float) -> float:
+    table = glyph_widths(font)
+    missing = table.get("?", 500)
+    return sum(table.get(ch, missing) for ch in text) * size / 1000
+
+def wrap(text: str, font: str, size: float, max_width: float) -> list:
+    """
+    Greedy word wrap on measured widths. Words wider than a line are
+    broken between characters.
+    """
+    table = glyph_widths(font)
+    missing = table.get("?", 500)
+    limit = max_width * 1000 / size
+    space = table.get(" ", 278)
+    lines, line, used = [], [], 0.0
+    for word in text.split():
+        w = sum(table.get(ch, missing) for ch in word)
+        if line and used + space + w <= limit:
+            line.append(word)
+            used += space + w
+            continue
+        if line:
+            lines.append(" ".join(line))
+            line, used = [], 0.0
+        while w > limit:
+            cut, acc = 0, 0.0
+            for cut, ch in enumerate(word):
+                acc += table.get(ch, missing)
+                if acc > limit:
+                    break
+            cut = max(cut, 1)
+            lines.append(word[:cut])
+            word = word[cut:]
+            w = sum(table.get(ch, missing) for ch in word)
+        line, used = [word], w
+    if line:
+        lines.append(" ".join(line))
+    return lines
+
+# -----------------------
+# FLOWING WRITER
+# -----------------------
+class FlowWriter:
+    """
+    Writes headings, paragraphs and bullets top to bottom, starting a new
+    page whenever the next line would cross the bottom margin.
+
+    out is a path or binary stream. Pages are flushed into compressed
+    page streams as they are finished, so memory grows with the
+    compressed size of the document rather than with its layout.
+    """
+    BODY = ("Helvetica", 10, 12)          # font, size, leading
+    BOLD = "Helvetica-Bold"
+    HEADINGS = {1: (16, 20), 2: (14, 18), 3: (11, 14)}
+
+    def __init__(self, out, pagesize=A4, margin=40, footer=None):
+        self.c = canvas.Canvas(out, pagesize=pagesize, invariant=1, pageCompression=1)
+        self.width, self.height = pagesize
+        self.margin = margin
+        self.footer = footer
+        self.page = 1
+        self.y = self.height - margin
+
+    @property
+    def line_width(self):
+        return self.width - 2 * self.margin
+
+    def _ensure(self, needed):
+        if self.y - needed < self.margin:
+            self.new_page()
+
+    def _finish_page(self):
+        if self.footer:
+            self.c.setFont(self.BODY[0], 8)
+            self.c.drawRightString(self.width - self.margin, self.margin / 2, f"{self.footer} — page {self.page}")
+
+    def new_page(self):
+        self._finish_page()
+        self.c.showPage()
+        self.page += 1
+        self.y = self.height - self.margin
+
+    def heading(self, text, level=1, bookmark=None):
+        size, leading = self.HEADINGS.get(level, self.HEADINGS[3])
+        lines = wrap(text, self.BOLD, size, self.line_width)
+        # Keep a heading with at least two lines of what follows
+        self._ensure(leading * len(lines) + 2 * self.BODY[2])
+        if bookmark:
+            self.c.bookmarkPage(bookmark, fit="XYZ", top=self.y + leading)
+            self.c.addOutlineEntry(text, bookmark, level=level - 1)
+        self.c.setFont(self.BOLD, size)
+        for ln in lines:
+            self.c.drawString(self.margin, self.y, ln)
+            self.y -= leading
+
+    def paragraph(self, text, indent=0, bullet=None, space_after=4):
+        font, size, leading = self.BODY
+        prefix = f"{bullet} " if bullet else ""
+        offset = text_width(prefix, font, size)
+        for i, ln in enumerate(wrap(text, font, size, self.line_width - indent - offset)):
+            self._ensure(leading)
+            self.c.setFont(font, size)
+            if i == 0 and prefix:
+                self.c.drawString(self.margin + indent, self.y, prefix)
+            self.c.drawString(self.margin + indent + offset, self.y, ln)
+            self.y -= leading
+        self.y -= space_after
+
+    def bullets(self, items, indent=8):
+        for it in items:
+            self.paragraph(str(it), indent=indent, bullet="•")
+
+    def spacer(self, height):
+        self.y -= height
+
+    def close(self):
+        self._finish_page()
+        self.c.save()
@@ -0,0 +1,24 @@
+# utils/profiling.py
+import streamlit as st
+from utils.auth import is_admin
+from utils.metrics import page_run
+
+def start_page(page):
+    """
+    Call after require_login() at the top of a page, and put the rest of
+    the page in a try: block whose finally: calls finish_page(run).
+    Admins get a sidebar toggle that profiles the rerun.
+    """
+    profile = is_admin() and st.sidebar.checkbox("Profile this page", key="profile_page")
+    return page_run(page, profile=profile)
+
+def finish_page(run):
+    """
+    Call from the finally: of the page started with start_page(), so the
+    rerun is recorded and the profiler stopped even when st.stop(),
+    st.rerun() or an error ends it early.
+    """
+    report = run.finish()
+    if report:
+        with st.sidebar.expander("Profile", expanded=True):
+            st.code(report, language="text")
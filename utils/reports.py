@@ -0,0 +1,165 @@
+# utils/reports.py
+import os
+import re
+import shutil
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+
+from utils.metrics import record_cache, timed, timer
+
+# Functions in utils.doc_generator. That module pulls in python-docx and
+# reportlab, so it is only imported once something is rendered.
+RENDERERS = {"docx": "make_docx", "pdf": "make_pdf"}
+
+# Bump when the template or layout changes so cached and prebuilt renders
+# are dropped. Kept here rather than in utils.doc_generator so it can be
+# read without importing the renderers.
+TEMPLATE_VERSION = 2
+
+COMPENDIUM_DIR = os.environ.get("HTM_COMPENDIUM_DIR", "data/.compendiums")
+COMPENDIUM_ENTRIES = 8   # older cached compendiums are deleted beyond this
+
+# -----------------------
+# COUNTRY PACK INPUTS
+# -----------------------
+def _strings(row) -> dict:
+    return {k: str(v) for k, v in row.items()}
+
+def _sentences(text) -> list:
+    if not isinstance(text, str):
+        return []
+    return [s.strip() for s in re.split(r"(?<=\.)\s+(?=[A-Z])", text) if s.strip()]
+
+def country_pack(store, country) -> dict:
+    """
+    The make_docx/make_pdf arguments for one country from a CountryStore,
+    as plain strings so they can be sent to a worker process.
+    """
+    profile = store.profile(country)
+    texts = profile.get("ctexts", {})
+    budgeting = profile.get("budgeting", {})
+    recommendations = [r.strip() for r in str(budgeting.get("Recommendations", "")).split(";") if r.strip()]
+    return {
+        "country_name": country,
+        "proc_row": _strings(profile.get("procurement", {})),
+        "pfm_row": _strings(profile.get("pfm", {})),
+        "qa_row": _strings(profile.get("qa", {})),
+        "bottlenecks": _sentences(texts.get("bottlenecks")),
+        "recommendations": recommendations + _sentences(texts.get("innovations")),
+    }
+
+def pack_filename(country, fmt) -> str:
+    return f"{re.sub(r'[^A-Za-z0-9]+', '_', country).strip('_')}_two_pager.{fmt}"
+
+# -----------------------
+# BATCH EXPORT
+# -----------------------
+def render(fmt, pack):
+    """
+    Render one two-pager. Returns (filename, bytes).
+    """
+    from utils import doc_generator
+    make = getattr(doc_generator, RENDERERS[fmt])
+    return pack_filename(pack["country_name"], fmt), make(**pack).getvalue()
+
+def _rendered(jobs, workers):
+    # Worker processes do not outlive the pool, so the render cache that
+    # counts is this process's: hits are served from it, only misses go
+    # to the pool, and what the workers return is cached on the way back
+    from utils.doc_generator import render_cache, render_key
+    missing = []
+    for fmt, pack in jobs:
+        payload = render_cache.get(render_key(fmt, **pack))
+        if payload is None:
+            missing.append((fmt, pack))
+            continue
+        record_cache(f"render_{fmt}", True)
+        yield pack_filename(pack["country_name"], fmt), payload
+    if workers <= 1 or len(missing) <= 1:
+        for job in missing:
+            yield render(*job)  # make_docx/make_pdf record the miss and fill the cache
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(missing))) as pool:
+        futures = {pool.submit(render, *job): job for job in missing}
+        for fut in as_completed(futures):
+            fmt, pack = futures[fut]
+            name, payload = fut.result()
+            record_cache(f"render_{fmt}", False)
+            render_cache.put(render_key(fmt, **pack), payload)
+            yield name, payload
+
+@timed("export_zip")
+def export_zip(packs, out, formats=("docx", "pdf"), workers=None, progress=None):
+    """
+    Render every pack in every format on a process pool and write each
+    file into the ZIP at out (a path or binary stream) as soon as it is
+    done. progress(done, total, filename) is called after each file.
+    """
+    jobs = [(fmt, pack) for pack in packs for fmt in formats]
+    workers = min(workers or os.cpu_count() or 1, max(len(jobs), 1))
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for done, (name, payload) in enumerate(_rendered(jobs, workers), 1):
+            zf.writestr(name, payload)
+            if progress:
+                progress(done, len(jobs), name)
+    return out
+
+class _Tee:
+    # Binary stream that copies every write to a second stream
+    def __init__(self, out, copy):
+        self.out, self.copy = out, copy
+
+    def write(self, data):
+        self.out.write(data)
+        self.copy.write(data)
+        return len(data)
+
+    def flush(self):
+        self.out.flush()
+        self.copy.flush()
+
+def _sink(out):
+    # out as a writable binary stream; a path is opened (and closed) here
+    return open(out, "wb") if isinstance(out, (str, os.PathLike)) else nullcontext(out)
+
+def _prune_compendiums(keep):
+    files = sorted((os.stat(f).st_mtime, f) for f in
+                   (os.path.join(COMPENDIUM_DIR, n) for n in os.listdir(COMPENDIUM_DIR) if n.endswith(".pdf")))
+    for _, f in files[:-COMPENDIUM_ENTRIES]:
+        if f != keep:
+            os.remove(f)
+
+@timed("export_compendium")
+def export_compendium(store, summary, countries, out):
+    """
+    Write the regional compendium PDF for the given countries to out
+    (a path or binary stream), with the wca_summary frame as the
+    regional sections.
+
+    Packs are built one country at a time and the PDF is written to out
+    as it is rendered, with a copy going to a file in COMPENDIUM_DIR;
+    a repeat request is then copied from that file.
+    """
+    from utils.doc_generator import make_compendium, compendium_key
+    rows = list(zip(summary["Sub-Topic"], summary["Regional Summary"])) if not summary.empty else []
+    key = compendium_key((country_pack(store, c) for c in countries), rows)
+    path = os.path.join(COMPENDIUM_DIR, f"{key}.pdf")
+    hit = os.path.exists(path)
+    record_cache("render_compendium", hit)
+    if hit:
+        os.utime(path)
+        with open(path, "rb") as src, _sink(out) as dest:
+            shutil.copyfileobj(src, dest)
+        return out
+    os.makedirs(COMPENDIUM_DIR, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with timer("render_compendium"), open(tmp, "wb") as copy, _sink(out) as dest:
+            make_compendium((country_pack(store, c) for c in countries), rows, _Tee(dest, copy))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _prune_compendiums(keep=path)
+    return out
@@ -0,0 +1,74 @@
+# utils/schema.py
+import pandas as pd
+
+# -----------------------
+# CANONICAL LEVELS (lowest -> highest)
+# -----------------------
+YES_NO = ["No", "Yes"]
+YES_PARTIAL_NO = ["No", "Partial", "Yes"]
+LOW_MEDIUM_HIGH = ["Low", "Medium", "High"]
+WEAK_MODERATE_STRONG = ["Weak", "Moderate", "Strong"]
+FREQUENCY = ["Rare", "Occasional", "Often", "Frequent"]
+
+# -----------------------
+# SCHEMA REGISTRY
+# -----------------------
+# dataset -> column -> list of ordered levels, or a pandas dtype string
+SCHEMAS = {
+    "procurement": {
+        "Dedicated Procurement Agency": YES_NO,
+        "Autonomy Level": LOW_MEDIUM_HIGH,
+        "HTM Procurement Guidelines": YES_NO,
+    },
+    "pfm": {
+        "Budget Allocation Timeliness": WEAK_MODERATE_STRONG,
+        "Payment Delays": FREQUENCY,
+        "Alignment with Procurement Cycle": LOW_MEDIUM_HIGH,
+    },
+    "qa": {
+        "QA Policy Exists": YES_NO,
+        "Pre-shipment Testing": YES_PARTIAL_NO,
+        "Post-market Surveillance": WEAK_MODERATE_STRONG,
+    },
+    "cofinancing": {
+        "Execution Rate (%)": "float64",
+        "Risk of Non-Materialization": LOW_MEDIUM_HIGH,
+    },
+}
+
+def ordinal(levels) -> pd.CategoricalDtype:
+    return pd.CategoricalDtype(levels, ordered=True)
+
+def to_levels(s: pd.Series, levels) -> pd.Series:
+    """
+    Convert a column of strings to an ordered Categorical, matching the
+    canonical levels case- and whitespace-insensitively. Returns None
+    if the column has values outside the levels, so the caller can keep
+    it as plain strings instead of dropping data.
+    """
+    lookup = {lv.lower(): lv for lv in levels}
+    raw = s.astype("string").str.strip().str.lower()
+    mapped = raw.map(lookup)
+    if (mapped.isna() & raw.notna() & (raw != "")).any():
+        return None
+    return mapped.astype(ordinal(levels))
+
+def apply_schema(name: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the columns of a dataset to the types in SCHEMAS[name].
+    Columns missing from the frame are ignored.
+    """
+    spec = SCHEMAS.get(name)
+    if not spec:
+        return df
+    cast = {}
+    for col, kind in spec.items():
+        if col not in df.columns:
+            continue
+        if isinstance(kind, list):
+            converted = to_levels(df[col], kind)
+            if converted is not None:
+                cast[col] = converted
+        else:
+            cast[col] = pd.to_numeric(df[col], errors="coerce").astype(kind)
+    return df.assign(**cast) if cast else df
@@ -0,0 +1,79 @@
+# utils/scoring.py
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# -----------------------
+# RULES
+# -----------------------
+@dataclass(frozen=True)
+class Rule:
+    """
+    Award points[level] for the value in column, multiplied by weight.
+    Levels not listed (and missing values) score 0.
+    """
+    column: str
+    points: dict
+    weight: float = 1.0
+
+@dataclass(frozen=True)
+class Scorecard:
+    """
+    A composite score: base + the weighted points of every rule.
+    """
+    rules: list
+    base: float = 0.0
+
+    @property
+    def max_score(self):
+        return self.base + sum(r.weight * max(r.points.values(), default=0) for r in self.rules)
+
+# -----------------------
+# ENGINE
+# -----------------------
+def _rule_points(s: pd.Series, rule: Rule) -> np.ndarray:
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # One lookup table per category, indexed by the integer codes
+        lookup = {str(k).lower(): v for k, v in rule.points.items()}
+        table = np.array([lookup.get(str(c).lower(), 0) for c in s.cat.categories] + [0], dtype=float)
+        return table[s.cat.codes.to_numpy()]  # code -1 (missing) hits the trailing 0
+    lookup = {str(k).lower(): float(v) for k, v in rule.points.items()}
+    return s.astype("string").str.strip().str.lower().map(lookup).fillna(0).to_numpy(dtype=float)
+
+def score(df: pd.DataFrame, card: Scorecard) -> pd.Series:
+    """
+    Evaluate every rule of a scorecard over the whole frame.
+    Rules whose column is missing from df contribute 0.
+    """
+    total = np.full(len(df), card.base, dtype=float)
+    for rule in card.rules:
+        if rule.column in df.columns:
+            total += rule.weight * _rule_points(df[rule.column], rule)
+    return pd.Series(total, index=df.index)
+
+# -----------------------
+# SCORECARDS
+# -----------------------
+QA_READINESS = Scorecard(
+    base=1,
+    rules=[
+        Rule("QA Policy Exists", {"Yes": 1}),
+        Rule("Pre-shipment Testing", {"Yes": 1, "Partial": 1}),
+        Rule("Post-market Surveillance", {"Moderate": 2, "Strong": 2}),
+    ],
+)
+
+PFM_READINESS = Scorecard(
+    rules=[
+        Rule("Budget Allocation Timeliness", {"Moderate": 1, "Strong": 2}),
+        Rule("Payment Delays", {"Occasional": 1, "Rare": 2}),
+        Rule("Alignment with Procurement Cycle", {"Medium": 1, "High": 2}),
+    ],
+)
+
+COFINANCING_READINESS = Scorecard(
+    rules=[
+        Rule("Risk of Non-Materialization", {"Low": 2, "Medium": 1}),
+    ],
+)
@@ -0,0 +1,175 @@
+# utils/search.py
+import html
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+# Free-text datasets and how results label them
+SEARCH_DATASETS = {
+    "ctexts": "Country narrative",
+    "cpfm": "Procurement & PFM",
+    "budgeting": "Budgeting",
+    "wca_summary": "Regional summary",
+}
+REGIONAL = "Regional"  # country of wca_summary documents
+
+TOKEN = re.compile(r"\w+")
+MAX_EXPANSIONS = 50    # vocabulary terms a prefix may expand to
+K1, B = 1.2, 0.75      # BM25 parameters
+
+# -----------------------
+# TEXT
+# -----------------------
+def fold(text: str) -> str:
+    """
+    Accent- and case-insensitive form of text, so "Marchés" and
+    "MARCHES" index and match alike.
+    """
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)).casefold()
+
+def _spans(text: str):
+    # (start, end, folded term) of every token; text is NFC so accented
+    # letters are single characters inside one token
+    return [(m.start(), m.end(), fold(m.group())) for m in TOKEN.finditer(text)]
+
+# -----------------------
+# INDEX
+# -----------------------
+@dataclass(frozen=True)
+class Hit:
+    country: str
+    dataset: str
+    field: str
+    score: float
+    snippet: str   # HTML with matches in <mark>
+
+class SearchIndex:
+    """
+    Inverted index over every free-text cell of the SEARCH_DATASETS
+    frames, one document per (country, dataset, field).
+
+    Each term maps to numpy arrays of document ids and term counts, so
+    a query is a few vectorized BM25 updates instead of a scan of every
+    text column. Built once per data version (see derived.search_index)
+    and read-only afterwards.
+    """
+    def __init__(self, frames: dict):
+        self.docs = []        # (country, dataset, field, NFC text)
+        counts = {}           # term -> ([doc ids], [term counts])
+        lengths = []
+        for dataset, df in frames.items():
+            for country, field, text in self._documents(dataset, df):
+                terms = Counter(t for _, _, t in _spans(text))
+                if not terms:
+                    continue
+                doc = len(self.docs)
+                self.docs.append((country, dataset, field, text))
+                lengths.append(sum(terms.values()))
+                for term, n in terms.items():
+                    ids, tfs = counts.setdefault(term, ([], []))
+                    ids.append(doc)
+                    tfs.append(n)
+        self.postings = {t: (np.array(ids, dtype=np.int32), np.array(tfs, dtype=np.float64))
+                         for t, (ids, tfs) in counts.items()}
+        self.vocab = sorted(self.postings)
+        self.lengths = np.array(lengths, dtype=np.float64)
+        self.avg_length = self.lengths.mean() if lengths else 0.0
+        self.doc_country = np.array([d[0] for d in self.docs], dtype=object)
+        self.doc_dataset = np.array([d[1] for d in self.docs], dtype=object)
+        names = set(self.doc_country)
+        self.countries = sorted(names - {REGIONAL}) + ([REGIONAL] if REGIONAL in names else [])
+
+    @staticmethod
+    def _documents(dataset, df):
+        if dataset == "wca_summary":
+            for topic, text in zip(df["Sub-Topic"], df["Regional Summary"]):
+                if isinstance(text, str) and text.strip():
+                    yield REGIONAL, str(topic), unicodedata.normalize("NFC", text)
+            return
+        fields = [c for c in df.columns if c not in ("Country", "Year")]
+        for row in df[["Country", *fields]].itertuples(index=False):
+            for field, text in zip(fields, row[1:]):
+                if isinstance(text, str) and text.strip():
+                    yield str(row[0]), field, unicodedata.normalize("NFC", text)
+
+    def expand(self, prefix) -> list:
+        """
+        Vocabulary terms starting with prefix (at most MAX_EXPANSIONS).
+        """
+        i = bisect_left(self.vocab, prefix)
+        out = []
+        while i < len(self.vocab) and self.vocab[i].startswith(prefix) and len(out) < MAX_EXPANSIONS:
+            out.append(self.vocab[i])
+            i += 1
+        return out
+
+    def search(self, query, limit=20, prefix=True, countries=None, datasets=None) -> list:
+        """
+        Documents containing every query term, best BM25 score first.
+        With prefix=True the last term also matches longer words, so
+        results follow the query as it is typed.
+        """
+        terms = [fold(t) for t in TOKEN.findall(unicodedata.normalize("NFC", query))]
+        if not terms or not self.docs:
+            return []
+        groups = [[t] if t in self.postings else [] for t in terms]
+        if prefix:
+            groups[-1] = self.expand(terms[-1])
+
+        n = len(self.docs)
+        scores = np.zeros(n)
+        matched = np.zeros(n, dtype=np.int32)
+        for group in groups:
+            hit = np.zeros(n, dtype=bool)
+            for term in group:
+                ids, tf = self.postings[term]
+                idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+                norm = K1 * (1 - B + B * self.lengths[ids] / self.avg_length)
+                scores[ids] += idf * tf * (K1 + 1) / (tf + norm)
+                hit[ids] = True
+            matched += hit
+
+        keep = matched == len(groups)
+        if countries is not None:
+            keep &= np.isin(self.doc_country, list(countries))
+        if datasets is not None:
+            keep &= np.isin(self.doc_dataset, list(datasets))
+        found = np.flatnonzero(keep)
+        top = found[np.argsort(-scores[found], kind="stable")][:limit]
+        wanted = {t for group in groups for t in group}
+        return [Hit(*self.docs[i][:3], float(scores[i]), snippet(self.docs[i][3], wanted)) for i in top]
+
+# -----------------------
+# SNIPPETS
+# -----------------------
+def snippet(text, terms, width=40) -> str:
+    """
+    About width words of text around its first matching term, HTML
+    escaped, with every match wrapped in <mark>.
+    """
+    spans = _spans(text)
+    hits = [i for i, (_, _, t) in enumerate(spans) if t in terms]
+    if not spans:
+        return ""
+    first = hits[0] if hits else 0
+    lo = max(first - width // 4, 0)
+    hi = min(lo + width, len(spans))
+    lo = max(hi - width, 0)
+    start = 0 if lo == 0 else spans[lo][0]
+    end = len(text) if hi == len(spans) else spans[hi - 1][1]
+    out, pos = [], start
+    for s, e, t in spans[lo:hi]:
+        if t in terms:
+            out += [html.escape(text[pos:s]), "<mark>", html.escape(text[s:e]), "</mark>"]
+            pos = e
+    out.append(html.escape(text[pos:end]))
+    body = "".join(out).replace("\n", " ")
+    return ("… " if start > 0 else "") + body + (" …" if end < len(text) else "")
+
+def build_index(frames: dict) -> SearchIndex:
+    return SearchIndex({k: frames[k] for k in SEARCH_DATASETS if k in frames})
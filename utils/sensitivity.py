@@ -0,0 +1,97 @@
+# utils/sensitivity.py
+from dataclasses import dataclass
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# -----------------------
+# WEIGHT SCENARIOS
+# -----------------------
+def weight_grid(k, step=0.05) -> np.ndarray:
+    """
+    Every vector of k non-negative weights summing to 1 in multiples of
+    step, one per row (1771 rows for k=4, step=0.05).
+    """
+    m = round(1 / step)
+    # Stars and bars: k - 1 bar positions among m + k - 1 slots
+    bars = np.array(list(combinations(range(m + k - 1), k - 1)), dtype=np.int64).reshape(-1, k - 1)
+    edges = np.column_stack([np.full(len(bars), -1), bars, np.full(len(bars), m + k - 1)])
+    return (np.diff(edges, axis=1) - 1) / m
+
+def dirichlet_weights(k, n, alpha=1.0, seed=0) -> np.ndarray:
+    """
+    n weight vectors drawn from a symmetric Dirichlet(alpha): alpha=1 is
+    uniform over the simplex, larger values stay near equal weights.
+    """
+    return np.random.default_rng(seed).dirichlet(np.full(k, float(alpha)), n)
+
+# -----------------------
+# SWEEP
+# -----------------------
+def ranks(scores: np.ndarray) -> np.ndarray:
+    """
+    Rank of each column within every row of scores, 1 = highest.
+    """
+    order = np.argsort(-scores, axis=1)
+    out = np.empty(scores.shape, dtype=np.int32)
+    np.put_along_axis(out, order, np.arange(1, scores.shape[1] + 1, dtype=np.int32)[None, :], axis=1)
+    return out
+
+@dataclass(frozen=True)
+class Sensitivity:
+    n_scenarios: int            # number of weight scenarios
+    summary: pd.DataFrame       # per country rank statistics
+    first_place: pd.DataFrame   # per country, the weights under which it ranks first
+
+def sweep(components: pd.DataFrame, weights: np.ndarray, base_weights, index=None, interval=90) -> Sensitivity:
+    """
+    Score every country under every weight vector at once.
+
+    components holds one row per country and one normalized KPI per
+    column (see derived.risk_components); weights has one scenario per
+    row, in the same column order. The scores of all scenarios are the
+    single product weights @ components.T, ranked row by row, and the
+    rank statistics come from one histogram of ranks per country rather
+    than a loop or sort per scenario.
+    """
+    m = components.to_numpy(dtype=np.float64)
+    w = np.asarray(weights, dtype=np.float64)
+    base = np.asarray([base_weights[c] for c in components.columns], dtype=np.float64)
+    index = components.index if index is None else index
+    n_scenarios, n_countries = len(w), len(m)
+
+    r = ranks(w @ m.T)                                   # scenarios x countries
+    base_rank = ranks((m @ base)[None, :])[0]
+    # counts[i, j]: scenarios in which country i ranks j + 1
+    counts = np.bincount((r - 1 + np.arange(n_countries) * n_countries).ravel(),
+                         minlength=n_countries * n_countries).reshape(n_countries, n_countries)
+    cdf = counts.cumsum(axis=1) / n_scenarios
+    places = np.arange(1, n_countries + 1)
+
+    def quantile(q):
+        return (cdf < q - 1e-12).sum(axis=1) + 1
+
+    lo, hi = (100 - interval) / 2, 100 - (100 - interval) / 2
+    summary = pd.DataFrame({
+        "base_rank": base_rank,
+        "median_rank": quantile(0.5),
+        f"rank_p{lo:g}": quantile(lo / 100),
+        f"rank_p{hi:g}": quantile(hi / 100),
+        "best_rank": np.argmax(counts > 0, axis=1) + 1,
+        "worst_rank": n_countries - np.argmax(counts[:, ::-1] > 0, axis=1),
+        "p_first": counts[:, 0] / n_scenarios,
+        "p_top3": cdf[:, min(3, n_countries) - 1],
+        "same_rank": counts[np.arange(n_countries), base_rank - 1] / n_scenarios,
+        "mean_shift": (counts * np.abs(places[None, :] - base_rank[:, None])).sum(axis=1) / n_scenarios,
+    }, index=index)
+
+    # Regions of weight space: where each country comes first, summarised
+    # by the centroid and range of each weight over those scenarios
+    winner = np.argmin(r, axis=1)
+    g = pd.DataFrame(w, columns=components.columns).groupby(winner)
+    first = pd.DataFrame({"share": g.size() / n_scenarios})
+    for stat in ("mean", "min", "max"):
+        first = first.join(getattr(g, stat)().add_suffix(f" {stat}"))
+    first.index = np.asarray(index)[first.index]
+    return Sensitivity(n_scenarios, summary.sort_values("base_rank"), first.sort_values("share", ascending=False))
@@ -0,0 +1,149 @@
+# utils/snapshot.py
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from utils.metrics import record_cache
+from utils.schema import apply_schema
+
+SNAPSHOT_DIR = os.environ.get("HTM_SNAPSHOT_DIR", "data/.snapshots")
+SNAPSHOT_VERSION = 2
+
+# -----------------------
+# SOURCE DECODING
+# -----------------------
+def _decode(raw: bytes) -> str:
+    """
+    Decode a CSV file once. UTF-8 is tried first; files exported from
+    Excel on Windows (e.g. cpfm.csv) fall back to cp1252, then latin-1.
+    """
+    for enc in ("utf-8-sig", "cp1252"):
+        try:
+            return raw.decode(enc)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode("latin-1")
+
+def _source_stat(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+def _hash_bytes(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+# -----------------------
+# SNAPSHOT FILES
+# -----------------------
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+def snapshot_paths(path):
+    """
+    Return (arrow_file, meta_file) for the snapshot of a source CSV.
+    """
+    base = os.path.join(SNAPSHOT_DIR, dataset_name(path))
+    return base + ".arrow", base + ".meta.json"
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _write_meta(meta_path, meta):
+    def write(tmp):
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+    _write_atomic(meta_path, write)
+
+def _map(arrow_path) -> pd.DataFrame:
+    # Uncompressed Arrow IPC so the buffers are read straight from the mapping
+    return feather.read_table(arrow_path, memory_map=True).to_pandas()
+
+def build_snapshot(path, raw: bytes = None) -> pd.DataFrame:
+    """
+    Decode and parse a source CSV, apply its schema (see utils/schema.py)
+    and write it as an Arrow snapshot. Returns the parsed DataFrame.
+    If the snapshot directory is not writable the frame is still
+    returned, just not persisted.
+    """
+    if raw is None:
+        with open(path, "rb") as f:
+            raw = f.read()
+    df = apply_schema(dataset_name(path), pd.read_csv(io.StringIO(_decode(raw))))
+
+    arrow_path, meta_path = snapshot_paths(path)
+    meta = {"version": SNAPSHOT_VERSION, "sha256": _hash_bytes(raw), **_source_stat(path)}
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        _write_atomic(arrow_path, lambda tmp: feather.write_feather(table, tmp, compression="uncompressed"))
+        _write_meta(meta_path, meta)
+    except OSError:
+        pass
+    return df
+
+def _current(path):
+    # The snapshot's Arrow path if it matches the source, otherwise the
+    # freshly parsed frame (which also rebuilds the snapshot)
+    arrow_path, meta_path = snapshot_paths(path)
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get("version") != SNAPSHOT_VERSION or not os.path.exists(arrow_path):
+        record_cache("snapshot", False)
+        return build_snapshot(path)
+
+    stat = _source_stat(path)
+    if meta.get("mtime_ns") == stat["mtime_ns"] and meta.get("size") == stat["size"]:
+        record_cache("snapshot", True)
+        return arrow_path
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    if meta.get("sha256") != _hash_bytes(raw):
+        record_cache("snapshot", False)
+        return build_snapshot(path, raw)
+    record_cache("snapshot", True)
+
+    try:
+        _write_meta(meta_path, {**meta, **stat})
+    except OSError:
+        pass
+    return arrow_path
+
+def load_snapshot(path) -> pd.DataFrame:
+    """
+    Load a DATA_FILES dataset from its snapshot, rebuilding it only
+    when the source CSV has changed.
+
+    A matching mtime and size is trusted as-is. Otherwise the source is
+    hashed, and an unchanged hash (e.g. after a redeploy touched every
+    file) just refreshes the metadata instead of reparsing.
+    """
+    current = _current(path)
+    return _map(current) if isinstance(current, str) else current
+
+def snapshot_table(path) -> pa.Table:
+    """
+    A DATA_FILES dataset as a memory-mapped Arrow table (same freshness
+    rules as load_snapshot), for readers that stream it in batches
+    rather than convert the whole table to pandas.
+    """
+    current = _current(path)
+    if isinstance(current, str):
+        return feather.read_table(current, memory_map=True)
+    return pa.Table.from_pandas(current, preserve_index=False)
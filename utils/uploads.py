@@ -0,0 +1,283 @@
+# utils/uploads.py
+import importlib.util
+import io
+import os
+import tempfile
+import zipfile
+from contextlib import closing
+from dataclasses import dataclass
+
+import pandas as pd
+import pyarrow as pa
+
+from utils.schema import apply_schema
+
+MAX_BYTES = 1024 * 1024 * 1024   # reject uploads above 1 GB
+MAX_ROWS = 20_000_000
+SPILL_BYTES = 64 * 1024 * 1024   # CSVs above this are spilled to a temp Parquet file
+CHUNKSIZE = 50_000
+
+# -----------------------
+# RESULT
+# -----------------------
+@dataclass
+class UploadResult:
+    """
+    Outcome of reading an upload. error is None on success, otherwise
+    one of "empty", "too_large", "too_many_rows", "unsupported_format"
+    or "parse_error", with a readable message.
+    """
+    format: str = None
+    rows: int = 0
+    error: str = None
+    message: str = ""
+    spill_path: str = None
+    _df: pd.DataFrame = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def df(self) -> pd.DataFrame:
+        # Spilled uploads are read back memory-mapped on first access
+        if self._df is None and self.spill_path:
+            import pyarrow.parquet as pq
+            self._df = pq.read_table(self.spill_path, memory_map=True).to_pandas()
+        return self._df
+
+    def cleanup(self):
+        if self.spill_path and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+
+def _fail(error, message, fmt=None):
+    return UploadResult(format=fmt, error=error, message=message)
+
+# -----------------------
+# FORMAT DETECTION
+# -----------------------
+MAGIC = [
+    (b"PK\x03\x04", "xlsx"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "xls"),
+    (b"PAR1", "parquet"),
+]
+
+def detect_format(head: bytes) -> str:
+    """
+    Guess the format of an upload from its first bytes. Anything that is
+    not a known binary format and decodes as text is treated as CSV.
+    """
+    for magic, fmt in MAGIC:
+        if head.startswith(magic):
+            return fmt
+    if b"\x00" in head:
+        return None
+    return "csv"
+
+def _size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        pos = file.tell()
+        size = file.seek(0, io.SEEK_END)
+        file.seek(pos)
+    return size
+
+def _encoding(head: bytes) -> str:
+    try:
+        head.decode("utf-8")
+        return "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end of the sample is fine
+        return "utf-8-sig" if e.start >= len(head) - 3 else "cp1252"
+
+# -----------------------
+# READERS
+# -----------------------
+def _chunks(file, dataset, encoding, chunksize):
+    text = io.TextIOWrapper(file, encoding=encoding, newline="")
+    try:
+        for chunk in pd.read_csv(text, chunksize=chunksize):
+            yield apply_schema(dataset, chunk) if dataset else chunk
+    finally:
+        text.detach()
+
+def _widen(dtypes):
+    # One dtype for a column parsed chunk by chunk: the chunks' own if
+    # they agree, float64 for a mix of numbers, otherwise text
+    first = dtypes[0]
+    if all(d == first for d in dtypes):
+        return first
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        return "float64"
+    return "string"
+
+def _conform(chunk, dtypes):
+    cast = {c: chunk[c].astype(t) for c, t in dtypes.items() if c in chunk.columns and chunk[c].dtype != t}
+    return chunk.assign(**cast) if cast else chunk
+
+def _spill_file():
+    fd, path = tempfile.mkstemp(suffix=".parquet", prefix="upload_")
+    os.close(fd)
+    return path
+
+def _merge(parts, dtypes):
+    # One Parquet file from parts written under narrower types, each
+    # batch conformed to the final dtypes. Reads Parquet, not the CSV.
+    import pyarrow.parquet as pq
+    path, writer = _spill_file(), None
+    try:
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches():
+                table = pa.Table.from_pandas(_conform(batch.to_pandas(), dtypes), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema)
+                writer.write_table(table.cast(writer.schema))
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        os.remove(path)
+        raise
+    writer.close()
+    return path
+
+def _read_csv(file, size, dataset, encoding, max_rows, spill_bytes, chunksize):
+    """
+    Parse a CSV in one chunked pass. Column types come from the whole
+    file either way, so the same content gives the same frame whatever
+    its size: in memory the parsed chunks are widened to a common type,
+    and a file large enough to spill is written to Parquet as it is
+    parsed, starting a new part whenever a chunk widens a type. Parts
+    are merged under the final types at the end, which only happens
+    when a type changed part-way through the file.
+    """
+    spill = size > spill_bytes
+    if spill:
+        import pyarrow.parquet as pq
+    parts, seen, rows = [], {}, 0
+    writer, current, done = None, None, False
+    try:
+        with closing(_chunks(file, dataset, encoding, chunksize)) as chunks:
+            for chunk in chunks:
+                rows += len(chunk)
+                if rows > max_rows:
+                    return _fail("too_many_rows", f"Upload has more than {max_rows:,} rows.", "csv")
+                for c in chunk.columns:
+                    seen.setdefault(c, []).append(chunk[c].dtype)
+                if not spill:
+                    parts.append(chunk)
+                    continue
+                widened = {c: _widen(d) for c, d in seen.items()}
+                if widened != current:
+                    if writer is not None:
+                        writer.close()
+                        writer = None
+                    current = widened
+                    parts.append(_spill_file())
+                table = pa.Table.from_pandas(_conform(chunk, current), preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(parts[-1], table.schema)
+                writer.write_table(table.cast(writer.schema))
+        if writer is not None:
+            writer.close()
+            writer = None
+        dtypes = {c: _widen(d) for c, d in seen.items()}
+        if not spill:
+            df = pd.concat([_conform(p, dtypes) for p in parts], ignore_index=True) if parts else pd.DataFrame()
+            return UploadResult(format="csv", rows=rows, _df=df)
+        if not parts:
+            parts.append(_spill_file())
+            pq.write_table(pa.table({}), parts[0])
+        path = parts[0] if len(parts) == 1 else _merge(parts, dtypes)
+        done = True
+        return UploadResult(format="csv", rows=rows, spill_path=path)
+    finally:
+        if writer is not None:
+            writer.close()
+        if spill:
+            # Merged or failed part-way: drop the part files
+            for part in parts:
+                if not (done and part == path) and os.path.exists(part):
+                    os.remove(part)
+
+def _workbook_kind(file) -> str:
+    # A ZIP upload is only an xlsx workbook if it has the workbook part
+    # (docx, ods and plain zips share the magic bytes)
+    try:
+        with zipfile.ZipFile(file) as zf:
+            names = set(zf.namelist())
+    except zipfile.BadZipFile:
+        return None
+    finally:
+        file.seek(0)
+    return "xlsx" if "xl/workbook.xml" in names else "zip"
+
+EXCEL_ENGINES = {"xlsx": "openpyxl", "xls": "xlrd"}
+
+def _read_excel(file, fmt, max_rows):
+    if fmt == "xlsx":
+        kind = _workbook_kind(file)
+        if kind is None:
+            return _fail("parse_error", "Could not read the xlsx file: it is not a valid ZIP archive.", fmt)
+        if kind != "xlsx":
+            return _fail("unsupported_format", "Upload is a ZIP archive, not an Excel workbook.")
+    engine = EXCEL_ENGINES[fmt]
+    if importlib.util.find_spec(engine) is None:
+        return _fail("unsupported_format",
+                     f"Reading .{fmt} files needs {engine}, which is not installed; save the sheet as CSV.", fmt)
+    try:
+        return pd.read_excel(file, nrows=max_rows + 1, engine=engine)
+    except Exception as e:
+        # Corrupt workbooks fail in many ways inside the engine (BadZipFile, KeyError, ...)
+        return _fail("parse_error", f"Could not read the {fmt} file: {e}", fmt)
+
+def read_upload(file, dataset=None, max_bytes=MAX_BYTES, max_rows=MAX_ROWS,
+                spill_bytes=SPILL_BYTES, chunksize=CHUNKSIZE) -> UploadResult:
+    """
+    Read an uploaded file (any binary file-like object, e.g. a Streamlit
+    UploadedFile) without loading its raw bytes into memory.
+
+    The format is detected from magic bytes. CSVs are parsed in chunks,
+    with column types from the schema registry when dataset names one,
+    and large ones are spilled to a temporary Parquet file. Excel needs
+    openpyxl (.xlsx) or xlrd (.xls); without it the upload is reported
+    as unsupported.
+    """
+    if file is None:
+        return _fail("empty", "No file was uploaded.")
+    size = _size(file)
+    if size == 0:
+        return _fail("empty", "The uploaded file is empty.")
+    if size > max_bytes:
+        return _fail("too_large", f"Upload is {size / 1e6:,.1f} MB; the limit is {max_bytes / 1e6:,.1f} MB.")
+
+    file.seek(0)
+    head = file.read(64 * 1024)
+    file.seek(0)
+    fmt = detect_format(head)
+    try:
+        if fmt == "csv":
+            try:
+                return _read_csv(file, size, dataset, _encoding(head), max_rows, spill_bytes, chunksize)
+            except UnicodeDecodeError:
+                # Only reached when non-UTF-8 bytes appear after the sample
+                file.seek(0)
+                return _read_csv(file, size, dataset, "cp1252", max_rows, spill_bytes, chunksize)
+        if fmt in ("xlsx", "xls"):
+            df = _read_excel(file, fmt, max_rows)
+            if isinstance(df, UploadResult):
+                return df
+        elif fmt == "parquet":
+            import pyarrow.parquet as pq
+            pf = pq.ParquetFile(file)
+            if pf.metadata.num_rows > max_rows:
+                return _fail("too_many_rows", f"Upload has more than {max_rows:,} rows.", fmt)
+            df = pf.read().to_pandas()
+        else:
+            return _fail("unsupported_format", "Upload is not a CSV, Excel or Parquet file.")
+    except (ValueError, OSError, pa.ArrowException, pd.errors.ParserError) as e:
+        return _fail("parse_error", f"Could not read the {fmt} file: {e}", fmt)
+
+    if len(df) > max_rows:
+        return _fail("too_many_rows", f"Upload has more than {max_rows:,} rows.", fmt)
+    df = apply_schema(dataset, df) if dataset else df
+    return UploadResult(format=fmt, rows=len(df), _df=df)